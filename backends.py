@@ -0,0 +1,227 @@
+# backends.py
+import itertools
+import sys
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import database
+from replica import Replica
+
+
+# Where search/stats/count/export requests go. Every backend answers with the
+# same dicts as database.search_tickets() and database.iter_export(), so the
+# app and the CLI never need to know which one is active.
+class Backend:
+    name = ""
+
+    def open(self, wait: bool = False, on_sync: Optional[Callable[[bool, str], None]] = None):
+        # wait: finish any initial sync before returning (CLI); otherwise
+        # slow work happens in the background or on first use
+        database.result_cache.clear()
+
+    def close(self):
+        pass
+
+    def search(self, search: str, status: str, page: int, page_size: int = 50,
+               after=None, before=None, conn=None, candidate_limit: int = 0,
+               ticket_type: str = "", since: str = "", until: str = "") -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stats(self, search: str, status: str, ticket_type: str = "",
+              since: str = "", until: str = "", conn=None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def count(self, search: str, status: str, ticket_type: str = "",
+              since: str = "", until: str = "", conn=None) -> int:
+        return self.stats(search, status, ticket_type, since, until, conn)["total"]
+
+    def iter_export(self, search: str, status: str, batch_size: int = 1000, conn=None,
+                    ticket_type: str = "", since: str = "", until: str = "") -> Iterator[List[Dict]]:
+        raise NotImplementedError
+
+# Queries tickets.db where it lives (normally the Wi-Fi Reports share)
+class SQLiteBackend(Backend):
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def open(self, wait=False, on_sync=None):
+        super().open(wait, on_sync)
+        database.use_database(self.path)
+
+    def search(self, search, status, page, page_size=50, after=None, before=None, conn=None,
+               candidate_limit=0, ticket_type="", since="", until=""):
+        return database.search_tickets(search, status, page, page_size, after=after, before=before,
+                                       conn=conn, candidate_limit=candidate_limit,
+                                       ticket_type=ticket_type, since=since, until=until)
+
+    def stats(self, search, status, ticket_type="", since="", until="", conn=None):
+        return database.ticket_stats(search, status, conn, ticket_type, since, until)
+
+    def iter_export(self, search, status, batch_size=1000, conn=None,
+                    ticket_type="", since="", until=""):
+        return database.iter_export(search, status, batch_size, conn, ticket_type, since, until)
+
+# Same queries against the indexed local copy kept by replica.Replica
+class ReplicaBackend(SQLiteBackend):
+    name = "replica"
+
+    def __init__(self, path, cache_dir=None, interval: int = 300):
+        super().__init__(path)
+        self.replica = Replica(path, cache_dir, interval)
+
+    def open(self, wait=False, on_sync=None):
+        super().open(wait, on_sync)  # the share until a local copy exists
+        if wait:
+            self.replica.sync()
+        else:
+            self.replica.start(on_sync)
+
+    def close(self):
+        self.replica.stop()
+
+# Answers from memstore.MemoryStore, loaded from the source backend's database
+# on first use and reloaded whenever its data version moves
+class MemoryBackend(Backend):
+    name = "memory"
+
+    def __init__(self, source: SQLiteBackend):
+        import memstore  # numpy is only needed when this backend is chosen
+        if memstore.np is None:
+            raise RuntimeError("the memory backend needs numpy (pip install numpy)")
+        self.memstore = memstore
+        self.source = source
+        self.replica = getattr(source, "replica", None)
+        self.store = None
+        self._lock = threading.Lock()
+
+    def open(self, wait=False, on_sync=None):
+        super().open(wait, on_sync)
+        self.source.open(wait, on_sync)
+
+    def close(self):
+        self.source.close()
+
+    def current(self, conn=None):
+        # A reload builds a new store and swaps it in, so an export still
+        # iterating the old one is never mixed with new rows
+        with self._lock, database.connection_or_pooled(conn) as conn:
+            if self.store is None or self.store.version != database.data_version(conn):
+                store = self.memstore.MemoryStore()
+                store.load(conn)
+                self.store = store
+            return self.store
+
+    def search(self, search, status, page, page_size=50, after=None, before=None, conn=None,
+               candidate_limit=0, ticket_type="", since="", until=""):
+        return self.current(conn).search_tickets(search, status, page, page_size, after, before,
+                                                 candidate_limit, ticket_type, since, until)
+
+    def stats(self, search, status, ticket_type="", since="", until="", conn=None):
+        store = self.current(conn)
+        return store.stats(store.mask(search, status, ticket_type, since, until).nonzero()[0])
+
+    def iter_export(self, search, status, batch_size=1000, conn=None,
+                    ticket_type="", since="", until=""):
+        return self.current(conn).iter_export(search, status, batch_size, ticket_type, since, until)
+
+BACKENDS = ["sqlite", "replica", "memory"]
+
+def create(config: Dict[str, Any], name: str = None, path: str = None) -> Backend:
+    # name defaults to config "backend", else "replica" when replica.enabled
+    settings = config["replica"]
+    name = name or config.get("backend") or ("replica" if settings.get("enabled") else "sqlite")
+    path = path or config.get("db_path") or database.REMOTE_DB_PATH
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == "sqlite" or (name == "memory" and not settings.get("enabled")):
+        source = SQLiteBackend(path)
+    else:
+        source = ReplicaBackend(path, settings.get("cache_dir"), settings.get("sync_interval", 300))
+    return MemoryBackend(source) if name == "memory" else source
+
+# The backend the app's workers query; set by use_backend()
+active: Backend = SQLiteBackend(database.DB_PATH)
+
+def use_backend(backend: Backend, wait: bool = False,
+                on_sync: Optional[Callable[[bool, str], None]] = None):
+    global active
+    active.close()
+    active = backend
+    backend.open(wait, on_sync)
+
+# === Conformance check ===
+# Every backend must give the same answers for the same database. Per-type
+# counts are only compared when both sides report them: plain SQLite on a
+# file without ticket_meta leaves them out rather than classify every row.
+CHECK_SEARCHES = ["", "sysmon", "ap-", "inc00", "a_p", "zzqx"]
+CHECK_STATUSES = ["All", *database.STATUS_FILTERS, "vendor"]
+CHECK_TYPES = ["", "ONT", database.OTHER_TYPE]
+CHECK_DATES = [("", ""), ("2024-01-01", ""), ("", "2023-06-30"), ("2024-02-01", "2024-02-29")]
+
+def comparable(stats, other):
+    if not stats["types"] or not other["types"]:
+        return {k: v for k, v in stats.items() if k != "types"}
+    return stats
+
+def answers(backend: Backend, search, status, ticket_type, since, until):
+    # Everything a caller can observe for one filter combination
+    filters = {"ticket_type": ticket_type, "since": since, "until": until}
+    first = backend.search(search, status, 1, 25, **filters)
+    result = {"page 1": first, "page 2": backend.search(search, status, 2, 25, **filters)}
+    if first["last"]:
+        result["after"] = backend.search(search, status, 2, 25, after=first["last"], **filters)
+        result["before"] = backend.search(search, status, 1, 25, before=result["after"]["first"],
+                                          **filters)
+    result["stats"] = backend.stats(search, status, **filters)
+    result["count"] = backend.count(search, status, **filters)
+    result["export"] = [t for batch in backend.iter_export(search, status, 100, **filters)
+                        for t in batch]
+    return result
+
+def differences(expected: dict, actual: dict) -> List[str]:
+    found = []
+    for key, want in expected.items():
+        got = actual.get(key)
+        if key == "stats":
+            want, got = comparable(want, got), comparable(got, want)
+        elif isinstance(want, dict):
+            want, got = (
+                {**want, "candidates": None, "stats": comparable(want["stats"], got["stats"])},
+                {**got, "candidates": None, "stats": comparable(got["stats"], want["stats"])},
+            )
+        if want != got:
+            found.append(key)
+    return found
+
+def conformance(backends: List[Backend]) -> List[str]:
+    # Runs every check case against each backend in turn and returns one line
+    # per case where a backend disagrees with the first
+    cases = list(itertools.product(CHECK_SEARCHES, CHECK_STATUSES, CHECK_TYPES, CHECK_DATES))
+    results = []
+    for backend in backends:
+        use_backend(backend, wait=True)
+        results.append([answers(backend, s, st, t, *dates) for s, st, t, dates in cases])
+    use_backend(SQLiteBackend(database.DB_PATH))
+    report = []
+    for backend, answered in zip(backends[1:], results[1:]):
+        for case, expected, actual in zip(cases, results[0], answered):
+            if diff := differences(expected, actual):
+                report.append(f"{backend.name} vs {backends[0].name} {case}: {', '.join(diff)}")
+    return report
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python backends.py <tickets.db>  (checks every backend agrees)")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        candidates = [SQLiteBackend(sys.argv[1]), ReplicaBackend(sys.argv[1], cache_dir)]
+        try:
+            candidates.append(MemoryBackend(SQLiteBackend(sys.argv[1])))
+        except RuntimeError as e:
+            print(f"skipping memory backend: {e}", file=sys.stderr)
+        report = conformance(candidates)
+        database.pool.close_all()
+    print("\n".join(report) if report else f"All {len(candidates)} backends agree.")
+    sys.exit(1 if report else 0)
@@ -0,0 +1,228 @@
+# benchmark.py
+import argparse
+import datetime
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import database
+import migrations
+
+
+# Roughly the mix seen on the Wi-Fi Reports share: mostly closed-out work,
+# a long tail of open tickets, and descriptions built around device names.
+STATES = [
+    ("Closed", 40), ("Resolved", 25), ("Cancelled", 5), ("Assigned", 8),
+    ("Work in Progress", 7), ("Pending Vendor", 5), ("Pending Customer", 4),
+    ("Pending Change", 2), ("New", 4),
+]
+AREAS = ["MK", "EP", "HS", "AK", "DS", "BLZ", "TL", "POP", "CBR", "AKL"]
+DESCRIPTIONS = [
+    "{area}-AP-{n:03d} down",
+    "{area}-ap-{n:03d} not responding",
+    "Down AP in {area} building {n}",
+    "Sysmon alert: {area}-SW{n:02d} high CPU",
+    "Sysmon: link flapping on {area}-SW{n:02d} port {port}",
+    "ONT offline at {area} kiosk {n}",
+    "NABA reset requested for {area} stand {n}",
+    "Guest Wi-Fi slow near {area} gate {n}",
+    "Printer at {area} register {n} cannot reach network",
+    "POS terminal {area}-{n:04d} dropping connection",
+    "Replace patch cable {area} IDF {n}",
+    "Request new drop for {area} office {n}",
+]
+
+# (label, search, status, ticket type) combinations the benchmark queries
+SEARCHES = [
+    ("all", "", "All", ""),
+    ("pending", "", "Pending", ""),
+    ("resolved", "", "Resolved", ""),
+    ("access point", "-ap-", "All", ""),
+    ("number prefix", "INC001", "All", ""),
+    ("sysmon in progress", "sysmon", "In Progress", ""),
+    ("type ONT", "", "All", "ONT"),
+    ("no match", "zzqx", "All", ""),
+]
+PAGE_DEPTHS = [1, 10, 100]
+PAGE_SIZE = 100
+
+
+def generate(path, rows: int, seed: int = 1, years: int = 5, batch_size: int = 50000):
+    # Writes a tickets table shaped like the real one; same seed, same data
+    path = Path(path)
+    path.unlink(missing_ok=True)
+    rng = random.Random(seed)
+    states, weights = zip(*STATES)
+    end = datetime.datetime(2026, 1, 1)
+    span = years * 365 * 24 * 3600
+    with sqlite3.connect(path) as conn:
+        conn.execute("""CREATE TABLE tickets (
+            Number TEXT, Caller TEXT, ShortDescription TEXT, State TEXT,
+            Created TEXT, Priority TEXT)""")
+        done = 0
+        while done < rows:
+            batch = []
+            for i in range(done, min(rows, done + batch_size)):
+                created = end - datetime.timedelta(seconds=rng.randrange(span))
+                desc = rng.choice(DESCRIPTIONS).format(
+                    area=rng.choice(AREAS), n=rng.randrange(1, 1000), port=rng.randrange(1, 49))
+                batch.append((
+                    f"INC{i + 1:07d}",
+                    f"user{rng.randrange(1, 400):03d}",
+                    desc,
+                    rng.choices(states, weights)[0],
+                    created.strftime("%Y-%m-%d %H:%M:%S"),
+                    str(rng.randrange(1, 5)),
+                ))
+            conn.executemany("INSERT INTO tickets VALUES (?, ?, ?, ?, ?, ?)", batch)
+            done += len(batch)
+        conn.commit()
+    conn.close()
+
+def timed(fn, repeat: int):
+    # Best and median wall time over repeat runs, plus fn's last return value
+    times = []
+    value = None
+    for _ in range(repeat):
+        database.result_cache.clear()  # measure the query, not the cache
+        start = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), value
+
+def result(name: str, best: float, median: float, rows: int = None, **params):
+    entry = {"name": name, "params": params, "best_s": round(best, 6), "median_s": round(median, 6)}
+    if rows is not None:
+        entry["rows"] = rows
+        entry["rows_per_s"] = round(rows / best) if best else None
+    return entry
+
+def bench_search(repeat: int):
+    for label, search, status, ticket_type in SEARCHES:
+        for page in PAGE_DEPTHS:
+            best, median, data = timed(lambda: database.search_tickets(
+                search, status, page, PAGE_SIZE, ticket_type=ticket_type), repeat)
+            yield result(f"search {label} page {page}", best, median, len(data["tickets"]),
+                         search=search, status=status, type=ticket_type, page=page, paging="offset")
+            if page == 1:
+                continue
+            # The app reaches deep pages by cursor; take the cursor untimed
+            previous = database.search_tickets(search, status, page - 1, PAGE_SIZE,
+                                               ticket_type=ticket_type)
+            if not previous["last"]:
+                continue
+            best, median, data = timed(lambda: database.search_tickets(
+                search, status, page, PAGE_SIZE, after=previous["last"],
+                ticket_type=ticket_type), repeat)
+            yield result(f"search {label} page {page} keyset", best, median, len(data["tickets"]),
+                         search=search, status=status, type=ticket_type, page=page, paging="keyset")
+
+def bench_export(repeat: int):
+    for label, search, status, ticket_type in SEARCHES[:3]:
+        best, median, count = timed(lambda: sum(
+            len(batch) for batch in database.iter_export(search, status, ticket_type=ticket_type)
+        ), repeat)
+        yield result(f"export {label}", best, median, count,
+                     search=search, status=status, type=ticket_type)
+
+def bench_classify(path, repeat: int):
+    with sqlite3.connect(path) as conn:
+        descs = [r[0] for r in conn.execute("SELECT ShortDescription FROM tickets")]
+    conn.close()
+    best, median, _ = timed(lambda: [database.get_ticket_type(d) for d in descs], repeat)
+    yield result("get_ticket_type", best, median, len(descs))
+
+def bench_memory(repeat: int):
+    import memstore
+    store = memstore.MemoryStore()
+    best, median, _ = timed(store.load, 1)
+    yield result("memory load", best, median, store.size)
+    for label, search, status, ticket_type in SEARCHES:
+        best, median, data = timed(lambda: store.search_tickets(
+            search, status, 1, PAGE_SIZE, ticket_type=ticket_type), repeat)
+        yield result(f"memory search {label} page 1", best, median, len(data["tickets"]),
+                     search=search, status=status, type=ticket_type, page=1)
+
+def run(path, repeat: int = 3, replica: bool = False, memory: bool = False):
+    # replica: bootstrap the copy first, as the replica sync does, instead of
+    # querying it as the bare file the report job writes
+    path = Path(path)
+    if replica:
+        with sqlite3.connect(path) as conn:
+            migrations.bootstrap(conn)
+        conn.close()
+    database.use_database(path)
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    conn.close()
+    results = [*bench_search(repeat), *bench_export(repeat), *bench_classify(path, repeat)]
+    if memory:
+        results += bench_memory(repeat)
+    database.pool.close_all()
+    return {
+        "meta": {
+            "rows": rows,
+            "replica": replica,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+def regressions(report, baseline, threshold: float):
+    # Benchmarks whose best time grew by more than threshold (0.2 = 20%)
+    before = {r["name"]: r["best_s"] for r in baseline["results"]}
+    found = []
+    for r in report["results"]:
+        old = before.get(r["name"])
+        if old and r["best_s"] > old * (1 + threshold):
+            found.append(f"{r['name']}: {old:.4f}s -> {r['best_s']:.4f}s")
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ticket search and export")
+    parser.add_argument("db", help="tickets.db to benchmark (created with --generate)")
+    parser.add_argument("--generate", type=int, metavar="ROWS",
+                        help="first write a synthetic database with this many tickets")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replica", action="store_true",
+                        help="bootstrap indexes and ticket_meta before measuring")
+    parser.add_argument("--memory", action="store_true",
+                        help="also time the in-memory store (needs numpy)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generate(args.db, args.generate, args.seed)
+    report = run(args.db, args.repeat, args.replica, args.memory)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        for key in ("rows", "replica"):
+            if baseline["meta"].get(key) != report["meta"][key]:
+                print(f"warning: baseline {key} differs ({baseline['meta'].get(key)} vs "
+                      f"{report['meta'][key]})", file=sys.stderr)
+        if slower := regressions(report, baseline, args.threshold):
+            print("Slower than baseline:\n" + "\n".join(slower), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
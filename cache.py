@@ -0,0 +1,47 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+# LRU cache of search results. Every entry remembers the data version it was
+# computed against (DB file mtime + MAX(rowid)); a different version or an
+# entry older than ttl seconds counts as a miss.
+class ResultCache:
+    def __init__(self, size: int = 64, ttl: float = 300):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored at, version, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, entry_version, value = entry
+            if entry_version != version or time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, version: Any, value: Any):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def configure(self, size: int, ttl: float):
+        with self._lock:
+            self.size, self.ttl = size, ttl
+            while len(self._entries) > max(size, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
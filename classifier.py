@@ -0,0 +1,62 @@
+# classifier.py
+import hashlib
+import json
+import re
+from typing import Any, Dict, Iterable, List
+
+
+# Rules are tried in precedence order: the first rule with any matching
+# keyword (plain substring) or pattern (regex) names the ticket type.
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {"type": "Access Point", "keywords": ["-ap", " ap down", "down ap"]},
+    {"type": "Sysmon", "keywords": ["sysmon"]},
+    {"type": "ONT", "keywords": ["ont", "naba"]},
+]
+
+# Raises ValueError when a pattern is not a valid regex
+class Classifier:
+    # All rules compile into one case-insensitive alternation wrapped in a
+    # lookahead, so a single scan finds every position where any rule
+    # matches, overlapping matches included. At each position the
+    # alternation picks the highest-precedence rule; the best one seen wins.
+    def __init__(self, rules: Iterable[Dict[str, Any]] = DEFAULT_RULES):
+        rules = sorted(rules, key=lambda r: r.get("priority", 0))
+        self.rules = rules
+        self.types = [r["type"] for r in rules]
+        groups = []
+        for i, rule in enumerate(rules):
+            parts = [re.escape(k) for k in rule.get("keywords", [])]
+            for pattern in rule.get("patterns", []):
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"{rule['type']}: bad pattern {pattern!r} ({e})") from e
+                parts.append(pattern)
+            if parts:
+                groups.append(f"(?P<r{i}>{'|'.join(parts)})")
+        try:
+            self.pattern = re.compile("(?=" + "|".join(groups) + ")", re.IGNORECASE) if groups else None
+        except re.error as e:  # e.g. group names or references clashing across rules
+            raise ValueError(f"rules do not combine ({e})") from e
+
+    @property
+    def signature(self) -> str:
+        # Changes whenever the rules do, so stored classifications can be redone
+        blob = json.dumps(self.rules, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(blob).hexdigest()
+
+    def classify(self, desc: str) -> str:
+        if not desc or self.pattern is None:
+            return ""
+        best = len(self.types)
+        for m in self.pattern.finditer(desc):
+            i = int(m.lastgroup[1:])
+            if i < best:
+                best = i
+                if i == 0:
+                    break
+        return self.types[best] if best < len(self.types) else ""
+
+    def classify_many(self, descs: Iterable[str]) -> List[str]:
+        classify = self.classify
+        return [classify(d) for d in descs]
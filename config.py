@@ -0,0 +1,68 @@
+# config.py
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from classifier import DEFAULT_RULES
+
+
+CONFIG_PATH = Path("config.json")
+
+DEFAULTS: Dict[str, Any] = {
+    "dark_mode": True,
+    # Override for the share path, e.g. a local folder standing in for it
+    "db_path": None,
+    # "sqlite", "replica" or "memory"; default: replica when replica.enabled
+    "backend": None,
+    "replica": {
+        "enabled": False,
+        "cache_dir": None,       # defaults to replica.default_cache_dir()
+        "sync_interval": 300,    # seconds between background re-syncs
+    },
+    # Ticket type rules in precedence order (see classifier.py)
+    "ticket_types": DEFAULT_RULES,
+    # SQL timing/plan recording, also switchable at runtime (Ctrl+Shift+D)
+    "diagnostics": {
+        "enabled": False,
+        "log_path": None,        # defaults to <replica cache dir>/sql.log
+    },
+    # Watch the database and update the shown rows when tickets change
+    "auto_refresh": {
+        "enabled": True,
+        "interval": 5,           # seconds between checks
+    },
+    "cache": {
+        "size": 64,              # result pages kept in memory, 0 disables
+        "ttl": 300,              # seconds before a cached page is re-queried
+    },
+}
+
+def load_config(path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    data = {}
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except:
+            data = {}
+    return merge(DEFAULTS, data)
+
+def update_config(path: Path = CONFIG_PATH, **changes) -> Dict[str, Any]:
+    # Only rewrite the given keys so other settings survive a theme toggle
+    data = {}
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except:
+            data = {}
+    data.update(changes)
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return merge(DEFAULTS, data)
+
+def merge(defaults: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(defaults)
+    for key, value in data.items():
+        if isinstance(merged.get(key), dict) and isinstance(value, dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
@@ -1,108 +1,669 @@
 # database.py
+import datetime
 import sqlite3
-from typing import List, Dict, Any
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Iterator
 from pathlib import Path
+from urllib.parse import quote
 
+import instrument
+from cache import ResultCache
+from classifier import Classifier
 
-DB_PATH = "\\\\wdw.disney.com\\data\\WCCTelecom\\Data\\Public\\Wi-Fi Reports\\tickets.db"
+
+REMOTE_DB_PATH = "\\\\wdw.disney.com\\data\\WCCTelecom\\Data\\Public\\Wi-Fi Reports\\tickets.db"
+DB_PATH = REMOTE_DB_PATH
+
+# Trigram FTS5 shadow index over the searchable columns. It is an external
+# content table, so it stores only the index and reads text from tickets.
+SEARCH_INDEX = "tickets_fts"
+
+# Side table holding each ticket's classified type, filled incrementally by
+# rowid so classification runs once per ticket rather than once per query
+META_TABLE = "ticket_meta"
+
+# Type filter / stats label for tickets no rule matched
+OTHER_TYPE = "Other"
+
+# Status filter label -> normalized status category stored in ticket_meta
+STATUS_FILTERS = {
+    "Resolved": "resolved",
+    "In Progress": "in_progress",
+    "Pending": "pending",
+    "Cancelled": "cancelled",
+    "Closed": "closed",
+}
+
+# Stats key -> the status categories it counts
+STAT_CATEGORIES = {
+    "resolved": ("resolved", "closed", "cancelled"),
+    "inProgress": ("in_progress",),
+    "pending": ("pending",),
+    "cancelled": ("cancelled",),
+}
+
+# Bump when ticket_meta's columns change so existing copies get rebuilt
+META_VERSION = 3
+
+# Key/value bookkeeping the app keeps inside a writable copy of the DB
+STATE_TABLE = "tos_state"
+
+# Ticket type rules; replaced from config.json by set_ticket_rules
+classifier = Classifier()
+
+# Keyset paging walks this index: ORDER BY Created DESC, Number matches it
+# exactly, so each page is a seek from the cursor instead of an OFFSET scan.
+PAGE_INDEX = "idx_tickets_created_number"
+PAGE_ORDER = "ORDER BY Created DESC, Number ASC"
+
+def read_only_uri(path) -> str:
+    p = str(path).replace("\\", "/")
+    if p.startswith("//"):
+        # UNC share: an empty URI authority followed by //server/share
+        p = "//" + p
+    elif len(p) > 1 and p[1] == ":":
+        p = "/" + p
+    return "file:" + quote(p, safe="/:") + "?mode=ro"
+
+def is_network_path(path) -> bool:
+    return str(path).replace("\\", "/").startswith("//")
+
+# Idle connections to the current DB_PATH, handed to one thread at a time.
+# SearchWorkers are short-lived QThreads, so thread-local handles would never
+# be reused; a checked-out connection is still only ever used by one thread.
+class ConnectionPool:
+    def __init__(self, max_idle: int = 4, check_after: float = 30.0):
+        self.max_idle = max_idle
+        self.check_after = check_after  # seconds idle before a health check
+        self._idle = []  # (path, conn, last used)
+        self._lock = threading.Lock()
+
+    def open(self, path) -> sqlite3.Connection:
+        conn = sqlite3.connect(read_only_uri(path), uri=True, check_same_thread=False,
+                               factory=instrument.InstrumentedConnection)
+        conn.execute("PRAGMA query_only = 1")
+        # Fallback classifier for databases without the ticket_meta table
+        conn.create_function("ticket_type", 1, get_ticket_type, deterministic=True)
+        conn.execute("PRAGMA cache_size = -16000")  # 16 MB page cache
+        if not is_network_path(path):
+            # mmap over SMB turns transient network errors into crashes
+            conn.execute("PRAGMA mmap_size = 268435456")
+        return conn
+
+    def healthy(self, conn: sqlite3.Connection) -> bool:
+        # schema_version reads the file header, so it fails on a handle the
+        # share dropped underneath us
+        try:
+            conn.execute("PRAGMA schema_version").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self, path) -> sqlite3.Connection:
+        path = str(path)
+        stale = []
+        conn = None
+        with self._lock:
+            while self._idle:
+                idle_path, idle_conn, used = self._idle.pop()
+                if idle_path != path:
+                    stale.append(idle_conn)
+                    continue
+                if time.monotonic() - used > self.check_after and not self.healthy(idle_conn):
+                    stale.append(idle_conn)
+                    continue
+                conn = idle_conn
+                break
+        for c in stale:
+            c.close()
+        return conn or self.open(path)
+
+    def release(self, path, conn: sqlite3.Connection):
+        conn.row_factory = None
+        with self._lock:
+            if str(path) == DB_PATH and len(self._idle) < self.max_idle:
+                self._idle.append((str(path), conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, conn, _ in idle:
+            conn.close()
+
+    @contextmanager
+    def connection(self, path):
+        conn = self.acquire(path)
+        try:
+            yield conn
+        except sqlite3.OperationalError as e:
+            # An interrupted query leaves a usable handle; anything else
+            # (disk I/O error after a share reconnect...) gets a fresh one
+            if "interrupted" in str(e):
+                self.release(path, conn)
+            else:
+                conn.close()
+            raise
+        except BaseException:
+            self.release(path, conn)
+            raise
+        else:
+            self.release(path, conn)
+
+pool = ConnectionPool()
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    return pool.connection(DB_PATH)
+
+def connection_or_pooled(conn: sqlite3.Connection = None):
+    # Callers that may need to interrupt a query hold the connection themselves
+    return nullcontext(conn) if conn is not None else get_connection()
+
+# Page results keyed by (search, status, type, dates, page, page size, cursor),
+# and each filter combination's stats
+result_cache = ResultCache()
+
+def data_version(conn: sqlite3.Connection):
+    # Cheap fingerprint of the data: file mtime catches in-place updates,
+    # MAX(rowid) catches appends the mtime resolution might hide
+    try:
+        mtime = Path(DB_PATH).stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    return mtime, conn.execute("SELECT MAX(rowid) FROM tickets").fetchone()[0]
+
+def cache_key(search: str, status: str, ticket_type: str, page: int, page_size: int,
+              candidate_limit: int = 0, since: str = "", until: str = "",
+              after=None, before=None):
+    # LIKE and the trigram index both ignore case. The cursor is part of the
+    # key: a page reached by cursor is whatever follows the rows the caller
+    # already has, which need not be the OFFSET page of the same number once
+    # the data has moved on.
+    cursor = None
+    if after is not None:
+        cursor = ("after", *after)
+    elif before is not None:
+        cursor = ("before", *before)
+    return (search.strip().lower(), status or "All", ticket_type or "All",
+            page, page_size, candidate_limit, since or "", until or "", cursor)
+
+def use_database(path):
+    # Point every later query at another copy of tickets.db (e.g. the replica)
+    global DB_PATH
+    DB_PATH = str(path)
+    pool.close_all()
+
+# Needs a writable connection; the triggers keep the index in step with
+# inserts, updates and deletes on tickets from then on.
+def ensure_search_index(conn: sqlite3.Connection):
+    exists = has_search_index(conn)
+    conn.executescript(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_INDEX} USING fts5(
+            ShortDescription, Number, Caller,
+            content='tickets', tokenize='trigram'
+        );
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_INDEX}_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO {SEARCH_INDEX}(rowid, ShortDescription, Number, Caller)
+            VALUES (new.rowid, new.ShortDescription, new.Number, new.Caller);
+        END;
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_INDEX}_ad AFTER DELETE ON tickets BEGIN
+            INSERT INTO {SEARCH_INDEX}({SEARCH_INDEX}, rowid, ShortDescription, Number, Caller)
+            VALUES ('delete', old.rowid, old.ShortDescription, old.Number, old.Caller);
+        END;
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_INDEX}_au AFTER UPDATE ON tickets BEGIN
+            INSERT INTO {SEARCH_INDEX}({SEARCH_INDEX}, rowid, ShortDescription, Number, Caller)
+            VALUES ('delete', old.rowid, old.ShortDescription, old.Number, old.Caller);
+            INSERT INTO {SEARCH_INDEX}(rowid, ShortDescription, Number, Caller)
+            VALUES (new.rowid, new.ShortDescription, new.Number, new.Caller);
+        END;
+    """)
+    if not exists:
+        conn.execute(f"INSERT INTO {SEARCH_INDEX}({SEARCH_INDEX}) VALUES ('rebuild')")
+    conn.commit()
+
+def ensure_page_index(conn: sqlite3.Connection):
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {PAGE_INDEX} ON tickets (Created DESC, Number)")
+    conn.commit()
+
+def get_state(conn: sqlite3.Connection, key: str, default=None):
+    if not has_table(conn, STATE_TABLE):
+        return default
+    row = conn.execute(f"SELECT value FROM {STATE_TABLE} WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_state(conn: sqlite3.Connection, key: str, value):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (key TEXT PRIMARY KEY, value)")
+    conn.execute(f"INSERT OR REPLACE INTO {STATE_TABLE} (key, value) VALUES (?, ?)", (key, value))
+
+def ticket_meta_signature() -> str:
+    # Changes with the table's columns and with the ticket type rules
+    return f"{META_VERSION}:{classifier.signature}"
+
+def ensure_ticket_meta(conn: sqlite3.Connection):
+    signature = ticket_meta_signature()
+    if get_state(conn, "ticket_meta") != signature:
+        # Rules or columns changed since the table was built: start over
+        conn.execute(f"DROP TABLE IF EXISTS {META_TABLE}")
+        set_state(conn, "ticket_meta", signature)
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {META_TABLE} (
+            ticket_rowid INTEGER PRIMARY KEY,
+            type TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT 'other',
+            created_at TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idx_{META_TABLE}_type ON {META_TABLE} (type, created_at);
+        CREATE INDEX IF NOT EXISTS idx_{META_TABLE}_status ON {META_TABLE} (status, created_at);
+    """)
+    update_ticket_meta(conn)
+
+def update_ticket_meta(conn: sqlite3.Connection, batch_size: int = 5000, rowids=None) -> int:
+    # Classifies tickets above the highest rowid already done, or the given
+    # rowids (e.g. tickets whose text or State changed); returns how many.
+    # Rows are read a batch at a time, so a bootstrap runs in bounded memory.
+    select = "SELECT rowid, ShortDescription, State, Created FROM tickets"
+    if rowids is None:
+        start = conn.execute(f"SELECT COALESCE(MAX(ticket_rowid), 0) FROM {META_TABLE}").fetchone()[0]
+        cur = conn.execute(f"{select} WHERE rowid > ? ORDER BY rowid", (start,))
+        batches = iter(lambda: cur.fetchmany(batch_size), [])
+    else:
+        rowids = list(rowids)
+        step = min(batch_size, 500)  # stay well under SQLite's variable limit
+        batches = (
+            conn.execute(f"{select} WHERE rowid IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+            for chunk in (rowids[i:i + step] for i in range(0, len(rowids), step))
+        )
+    done = 0
+    for chunk in batches:
+        types = classifier.classify_many(desc for _, desc, _, _ in chunk)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {META_TABLE} (ticket_rowid, type, status, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(rowid, t, status_category(state), sortable_created(created))
+             for (rowid, _, state, created), t in zip(chunk, types)],
+        )
+        done += len(chunk)
+    conn.commit()
+    return done
+
+def has_table(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    return has_table(conn, SEARCH_INDEX)
+
+def has_ticket_meta(conn: sqlite3.Connection) -> bool:
+    # A table left by an older version lacks columns the queries now use, and
+    # one built with other rules holds the wrong types; both are ignored
+    # (types are worked out per row instead) until ensure_ticket_meta redoes it
+    signature = get_state(conn, "ticket_meta")
+    return signature == ticket_meta_signature() and has_table(conn, META_TABLE)
 
-def build_where(search: str, status: str):
+def fts_phrase(search: str) -> str:
+    # Trigram phrase limited to the columns the LIKE search covered
+    return '{ShortDescription Number} : "' + search.replace('"', '""') + '"'
+
+def build_where(search: str, status: str, fts: bool = False,
+                ticket_type: str = "", meta: bool = False, since: str = "", until: str = "",
+                stats: bool = False):
     where = []
     params = []
     if search := search.strip():
-        like = f"%{search}%"
-        where.append("(ShortDescription LIKE ? OR Number LIKE ?)")
-        params.extend([like, like])
-    if status and status != "All":
+        # Trigrams need at least 3 chars, and % / _ keep their LIKE meaning
+        if fts and len(search) >= 3 and not any(c in search for c in "%_"):
+            where.append(f"tickets.rowid IN (SELECT rowid FROM {SEARCH_INDEX} WHERE {SEARCH_INDEX} MATCH ?)")
+            params.append(fts_phrase(search))
+        else:
+            like = f"%{search}%"
+            where.append("(ShortDescription LIKE ? OR Number LIKE ?)")
+            params.extend([like, like])
+    # With ticket_meta, the stats query (stats=True) puts status/type and the
+    # date range into one probe of it, so its (status, created_at) and
+    # (type, created_at) indexes read only the matching tickets. Page queries
+    # test the joined row instead: they walk the Created/Number page index in
+    # display order and stop at LIMIT, where the probe would make them fetch
+    # and sort every match first.
+    probe = []
+    probe_params = []
+    if status in STATUS_FILTERS:
+        if meta and stats:
+            probe.append("status = ?")
+            probe_params.append(STATUS_FILTERS[status])
+        else:
+            where.append(f"{status_expression(meta)} = ?")
+            params.append(STATUS_FILTERS[status])
+    elif status and status != "All":
+        # Any other value is matched against the raw State text
         where.append("State LIKE ?")
         params.append(f"%{status}%")
+    if ticket_type and ticket_type != "All":
+        if meta and stats:
+            probe.append("type = ?")
+            probe_params.append(type_value(ticket_type))
+        else:
+            where.append(f"{type_expression(meta)} = ?")
+            params.append(type_value(ticket_type))
+    dates = []
+    if since:
+        dates.append((">=", since))
+    if until:
+        dates.append(("<", day_after(until)))
+    if probe:
+        probe += [f"created_at {op} ?" for op, _ in dates]
+        where.append(f"tickets.rowid IN (SELECT ticket_rowid FROM {META_TABLE} WHERE {' AND '.join(probe)})")
+        params += probe_params + [value for _, value in dates]
+    else:
+        # A range on the leading column of the Created/Number page index
+        where += [f"Created {op} ?" for op, _ in dates]
+        params += [value for _, value in dates]
     clause = "WHERE " + " AND ".join(where) if where else ""
     return clause, params
 
+def day_after(date: str) -> str:
+    # Dates are "YYYY-MM-DD" and inclusive; Created is "YYYY-MM-DD HH:MM:SS"
+    # text, so the end of an inclusive range is "< the next day"
+    return (datetime.date.fromisoformat(date) + datetime.timedelta(days=1)).isoformat()
+
+def in_date_range(created, since: str = "", until: str = "") -> bool:
+    # The Created predicates of build_where() in Python
+    created = created or ""
+    return (not since or created >= since) and (not until or created < day_after(until))
+
+def sortable_created(created) -> str:
+    # Created as "YYYY-MM-DD HH:MM:SS" text for ticket_meta, so it sorts and
+    # compares with the date bounds the same way the tickets table does
+    try:
+        return datetime.datetime.fromisoformat(created).isoformat(sep=" ")
+    except (TypeError, ValueError):
+        return created or ""
+
 def get_ticket_type(desc: str) -> str:
-    desc = desc.lower()
-    if "-ap" in desc or " ap down" in desc or "down ap" in desc:
-        return "Access Point"
-    if "sysmon" in desc:
-        return "Sysmon"
-    if "ont" in desc or "naba" in desc:
-        return "ONT"
-    return ""
-
-def search_tickets(search: str, status: str, page: int, page_size: int = 50):
+    return classifier.classify(desc)
+
+def status_category(state: str) -> str:
+    # Keep in step with STATUS_CASE below
+    state = (state or "").strip().lower()
+    if state == "resolved":
+        return "resolved"
+    if state == "closed":
+        return "closed"
+    if state == "cancelled":
+        return "cancelled"
+    if state in ("assigned", "work in progress"):
+        return "in_progress"
+    if state.startswith("pending"):
+        return "pending"
+    return "other"
+
+# status_category() in SQL, for databases without ticket_meta
+STATUS_CASE = """(CASE lower(trim(State))
+    WHEN 'resolved' THEN 'resolved'
+    WHEN 'closed' THEN 'closed'
+    WHEN 'cancelled' THEN 'cancelled'
+    WHEN 'assigned' THEN 'in_progress'
+    WHEN 'work in progress' THEN 'in_progress'
+    ELSE CASE WHEN lower(trim(State)) LIKE 'pending%' THEN 'pending' ELSE 'other' END
+END)"""
+
+def type_value(ticket_type: str) -> str:
+    # Label shown in the UI -> value stored for the ticket
+    return "" if ticket_type == OTHER_TYPE else ticket_type
+
+def type_labels() -> List[str]:
+    return [*classifier.types, OTHER_TYPE]
+
+def set_ticket_rules(rules):
+    global classifier
+    classifier = Classifier(rules)
+    result_cache.clear()
+
+TICKET_COLUMNS = "Number, Caller, ShortDescription, State, Created"
+
+# With ticket_meta, every query reads the stored type and status through this
+# join; rows newer than the table are classified on the fly.
+META_JOIN = f"LEFT JOIN {META_TABLE} m ON m.ticket_rowid = tickets.rowid"
+
+def type_expression(meta: bool) -> str:
+    if meta:
+        return "COALESCE(m.type, ticket_type(ShortDescription))"
+    return "ticket_type(ShortDescription)"
+
+def status_expression(meta: bool) -> str:
+    return f"COALESCE(m.status, {STATUS_CASE})" if meta else STATUS_CASE
+
+def prepare_query(conn: sqlite3.Connection, search: str, status: str, ticket_type: str = "",
+                  since: str = "", until: str = ""):
+    # Returns the SELECT ... FROM part, WHERE clause, its params and whether
+    # ticket_meta is available
+    meta = has_ticket_meta(conn)
+    clause, params = build_where(search, status, has_search_index(conn), ticket_type, meta,
+                                 since, until)
+    source = f"tickets {META_JOIN}" if meta else "tickets"
+    select = f"SELECT {TICKET_COLUMNS}, {type_expression(meta)} FROM {source}"
+    return select, clause, params, meta
+
+def prepare_stats(conn: sqlite3.Connection, search: str, status: str, ticket_type: str = "",
+                  since: str = "", until: str = ""):
+    # WHERE clause, params and ticket_meta availability for fetch_stats()
+    meta = has_ticket_meta(conn)
+    clause, params = build_where(search, status, has_search_index(conn), ticket_type, meta,
+                                 since, until, stats=True)
+    return clause, params, meta
+
+# Keys of a ticket dict, in prepare_query() column order
+TICKET_KEYS = ["id", "assignee", "shortDescription", "status", "createdAt", "type"]
+
+def ticket_from_row(r) -> Dict[str, Any]:
+    # r is a sqlite3.Row or plain tuple in prepare_query() column order
+    return {
+        "id": r[0],
+        "assignee": r[1],
+        "shortDescription": r[2],
+        "status": r[3],
+        "createdAt": r[4],
+        "type": r[5],
+    }
+
+def fetch_stats(cur, clause, params, meta: bool = False) -> Dict[str, Any]:
+    # One pass over the filtered rows, grouped by status category (and type
+    # when ticket_meta stores it; classifying every row in Python is not
+    # worth it just for the counts)
+    groups = cur.execute(stats_sql(clause, meta), params).fetchall()
+    if not meta:
+        groups = [(status, None, n) for status, n in groups]
+    return stats_from_groups(groups, meta)
+
+def stats_sql(clause: str, meta: bool) -> str:
+    if meta:
+        return (f"SELECT {status_expression(meta)}, {type_expression(meta)}, COUNT(*) "
+                f"FROM tickets {META_JOIN} {clause} GROUP BY 1, 2")
+    return f"SELECT {STATUS_CASE}, COUNT(*) FROM tickets {clause} GROUP BY 1"
+
+def stats_from_groups(groups, with_types: bool) -> Dict[str, Any]:
+    # groups: (status category, type, count) rows
+    stats = {"total": 0, **{key: 0 for key in STAT_CATEGORIES}}
+    types = {label: 0 for label in type_labels()} if with_types else {}
+    for status, ticket_type, n in groups:
+        stats["total"] += n
+        for key, categories in STAT_CATEGORIES.items():
+            if status in categories:
+                stats[key] += n
+        label = ticket_type or OTHER_TYPE
+        if label in types:
+            types[label] += n
+    stats["types"] = types
+    return stats
+
+def add_condition(clause: str, condition: str) -> str:
+    return f"{clause} AND {condition}" if clause else f"WHERE {condition}"
+
+def fetch_page(cur, select, clause, params, page_size, offset=0, after=None, before=None):
+    # after/before are (Created, Number) cursors taken from the last/first row
+    # of a neighbouring page; without one we fall back to OFFSET.
+    if after is not None:
+        sql = page_sql(select, clause, "after")
+        return cur.execute(sql, params + [after[0], after[0], after[1], page_size]).fetchall()
+    if before is not None:
+        # Walk the index the other way, then flip back into display order
+        sql = page_sql(select, clause, "before")
+        rows = cur.execute(sql, params + [before[0], before[0], before[1], page_size]).fetchall()
+        return rows[::-1]
+    return cur.execute(page_sql(select, clause), params + [page_size, offset]).fetchall()
+
+def page_sql(select: str, clause: str, cursor: str = None) -> str:
+    # cursor: None (LIMIT/OFFSET), "after" or "before" (keyset seek)
+    if cursor == "after":
+        clause = add_condition(clause, "Created <= ? AND (Created < ? OR Number > ?)")
+        return f"{select} {clause} {PAGE_ORDER} LIMIT ?"
+    if cursor == "before":
+        clause = add_condition(clause, "Created >= ? AND (Created > ? OR Number < ?)")
+        return f"{select} {clause} ORDER BY Created ASC, Number DESC LIMIT ?"
+    return f"{select} {clause} {PAGE_ORDER} LIMIT ? OFFSET ?"
+
+def search_tickets(search: str, status: str, page: int, page_size: int = 50,
+                   after=None, before=None, conn: sqlite3.Connection = None,
+                   candidate_limit: int = 0, ticket_type: str = "",
+                   since: str = "", until: str = ""):
     page = max(1, page)
     offset = (page - 1) * page_size
 
-    clause, params = build_where(search, status)
+    with connection_or_pooled(conn) as conn:
+        key = cache_key(search, status, ticket_type, page, page_size, candidate_limit,
+                        since, until, after, before)
+        version = data_version(conn)
+        if (cached := result_cache.get(key, version)) is not None:
+            return cached
 
-    with get_connection() as conn:
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
+        select, clause, params, meta = prepare_query(conn, search, status, ticket_type,
+                                                     since, until)
 
-        # Total
-        total = cur.execute(f"SELECT COUNT(*) FROM tickets {clause}", params).fetchone()[0]
-
-        # Page
-        sql = f"""
-            SELECT Number, Caller, ShortDescription, State, Created
-            FROM tickets {clause}
-            ORDER BY Created DESC
-            LIMIT ? OFFSET ?
-        """
-        rows = cur.execute(sql, params + [page_size, offset]).fetchall()
-
-        tickets = [
-            {
-                "id": r["Number"],
-                "assignee": r["Caller"],
-                "shortDescription": r["ShortDescription"],
-                "status": r["State"],
-                "createdAt": r["Created"],
-                "type": get_ticket_type(r["ShortDescription"]),
-            }
-            for r in rows
-        ]
-
-        # Stats
-        stats = {"total": total}
-
-        # Helper: safely append condition
-        def count_with_condition(condition):
-            if clause:
-                sql = f"SELECT COUNT(*) FROM tickets {clause} AND {condition}"
-            else:
-                sql = f"SELECT COUNT(*) FROM tickets WHERE {condition}"
-            return cur.execute(sql, params).fetchone()[0]
+        # Total + stats in a single pass over the filtered rows. They are
+        # cached on their own, so every batch of the same results (each with
+        # its own cursor, and so its own key) reuses the first one's
+        stats_key = ("stats", *cache_key(search, status, ticket_type, 0, 0, 0, since, until))
+        if (stats := result_cache.get(stats_key, version)) is None:
+            stats = fetch_stats(cur, *prepare_stats(conn, search, status, ticket_type, since, until))
+            result_cache.put(stats_key, version, stats)
+        total = stats["total"]
+
+        if 0 < total <= candidate_limit and after is None and before is None:
+            # Small enough to keep every match: later, narrower searches are
+            # answered from memory by CandidateSet.refine
+            sql = f"{select} {clause} {PAGE_ORDER}"
+            rows = cur.execute(sql, params).fetchall()
+            candidates = CandidateSet(search, status, rows, ticket_type, with_types=meta,
+                                      since=since, until=until)
+            result = candidates.result(page, page_size, stats)
+        else:
+            rows = fetch_page(cur, select, clause, params, page_size, offset, after, before)
+            result = page_result(rows, stats)
+
+    result_cache.put(key, version, result)
+    return result
+
+def page_result(rows, stats, candidates=None) -> Dict[str, Any]:
+    # Cursors for the neighbouring pages
+    first = [rows[0][4], rows[0][0]] if rows else None
+    last = [rows[-1][4], rows[-1][0]] if rows else None
+    return {
+        "tickets": [ticket_from_row(r) for r in rows],
+        "total": stats["total"],
+        "stats": stats,
+        "first": first,
+        "last": last,
+        "candidates": candidates,
+    }
+
+# Every row matching (search, status, type, dates), in display order. A search
+# that only narrows this one (longer text containing the old text, a status or
+# type picked after "All", or a date range inside the old one) is a subset of
+# these rows and never needs the database.
+class CandidateSet:
+    def __init__(self, search: str, status: str, rows, ticket_type: str = "",
+                 with_types: bool = False, since: str = "", until: str = ""):
+        self.search = search.strip().lower()
+        self.status = status or "All"
+        self.ticket_type = ticket_type or "All"
+        self.since = since or ""
+        self.until = until or ""
+        self.rows = [tuple(r) for r in rows]
+        self.with_types = with_types  # mirror fetch_stats: type counts need ticket_meta
+
+    def covers(self, search: str, status: str, ticket_type: str = "",
+               since: str = "", until: str = "") -> bool:
+        search = search.strip().lower()
+        status = status or "All"
+        if any(c in search for c in "%_"):
+            return False  # LIKE wildcards, not literal text
+        return (self.search in search and self.status in ("All", status)
+                and self.ticket_type in ("All", ticket_type or "All")
+                and (not self.since or (since or "") >= self.since)
+                and (not self.until or bool(until) and until <= self.until))
+
+    def refine(self, search: str, status: str, ticket_type: str = "",
+               since: str = "", until: str = "") -> "CandidateSet":
+        rows = self.rows
+        needle = search.strip().lower()
+        if needle != self.search:
+            rows = [r for r in rows
+                    if needle in (r[2] or "").lower() or needle in (r[0] or "").lower()]
+        if status in STATUS_FILTERS and status != self.status:
+            wanted = STATUS_FILTERS[status]
+            rows = [r for r in rows if status_category(r[3]) == wanted]
+        elif (status or "All") not in ("All", self.status):
+            wanted = status.lower()
+            rows = [r for r in rows if wanted in (r[3] or "").lower()]
+        if (ticket_type or "All") not in ("All", self.ticket_type):
+            wanted = type_value(ticket_type)
+            rows = [r for r in rows if r[5] == wanted]
+        if (since or "", until or "") != (self.since, self.until):
+            rows = [r for r in rows if in_date_range(r[4], since, until)]
+        return CandidateSet(search, status, rows, ticket_type, self.with_types, since, until)
+
+    def stats(self) -> Dict[str, Any]:
+        groups = Counter((status_category(r[3]), r[5]) for r in self.rows)
+        return stats_from_groups(
+            [(status, t, n) for (status, t), n in groups.items()], self.with_types
+        )
+
+    def result(self, page: int, page_size: int = 50, stats=None) -> Dict[str, Any]:
+        start = (max(1, page) - 1) * page_size
+        rows = self.rows[start:start + page_size]
+        return page_result(rows, stats or self.stats(), self)
 
-        stats["resolved"] = count_with_condition("State IN ('Resolved','Closed','Cancelled')")
-        stats["inProgress"] = count_with_condition("State IN ('Assigned','Work in Progress')")
-        stats["pending"] = count_with_condition("State LIKE 'Pending%'")
+def ticket_stats(search: str, status: str, conn: sqlite3.Connection = None,
+                 ticket_type: str = "", since: str = "", until: str = "") -> Dict[str, Any]:
+    # Total and status/type counts without fetching a page
+    with connection_or_pooled(conn) as conn:
+        return fetch_stats(conn.cursor(),
+                           *prepare_stats(conn, search, status, ticket_type, since, until))
 
-    return {"tickets": tickets, "total": total, "stats": stats}
+def export_tickets(search: str, status: str, conn: sqlite3.Connection = None,
+                   ticket_type: str = "", since: str = "", until: str = "") -> List[Dict]:
+    return [t for batch in iter_export(search, status, conn=conn, ticket_type=ticket_type,
+                                       since=since, until=until)
+            for t in batch]
 
-def export_tickets(search: str, status: str) -> List[Dict]:
-    clause, params = build_where(search, status)
-    with get_connection() as conn:
-        conn.row_factory = sqlite3.Row
+def iter_export(search: str, status: str, batch_size: int = 1000,
+                conn: sqlite3.Connection = None, ticket_type: str = "",
+                since: str = "", until: str = "") -> Iterator[List[Dict]]:
+    # Streams the matching tickets in display order, batch_size at a time,
+    # so an export never holds the whole table in memory
+    with connection_or_pooled(conn) as conn:
         cur = conn.cursor()
-        # Build base query safely
-        base = "SELECT Number, Caller, ShortDescription, State, Created FROM tickets"
+        base, clause, params, _ = prepare_query(conn, search, status, ticket_type, since, until)
         if clause:
-            sql = f"{base} {clause} ORDER BY Created DESC"
+            sql = f"{base} {clause} {PAGE_ORDER}"
         else:
-            sql = f"{base} ORDER BY Created DESC"
-        rows = cur.execute(sql, params).fetchall()
-        return [
-            {
-                "id": r["Number"],
-                "assignee": r["Caller"],
-                "shortDescription": r["ShortDescription"],
-                "status": r["State"],
-                "createdAt": r["Created"],
-                "type": get_ticket_type(r["ShortDescription"]),
-            }
-            for r in rows
-        ]
\ No newline at end of file
+            sql = f"{base} {PAGE_ORDER}"
+        cur.execute(sql, params)
+        while rows := cur.fetchmany(batch_size):
+            yield [ticket_from_row(r) for r in rows]
@@ -0,0 +1,152 @@
+# instrument.py
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Deque, Dict, Optional
+
+
+# Off by default; set_enabled() flips it at runtime without reopening
+# connections, since every pooled connection is an InstrumentedConnection
+enabled = False
+records: Deque["StatementRecord"] = deque(maxlen=500)
+logger = logging.getLogger("tos_lookup.sql")
+logger.propagate = False
+_plans: Dict[str, str] = {}
+_lock = threading.Lock()
+
+def set_enabled(on: bool):
+    global enabled
+    enabled = on
+
+def configure_log(path: Path, max_bytes: int = 1_000_000, backups: int = 3):
+    # Rolling log of every recorded statement, one tab-separated line each
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s\t%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+class StatementRecord:
+    def __init__(self, sql: str, plan: str):
+        self.sql = " ".join(sql.split())
+        self.plan = plan
+        self.started = time.time()
+        self.seconds = 0.0
+        self.rows = 0
+        self.error = ""
+        self.done = False
+
+    def finish(self):
+        if self.done:
+            return
+        self.done = True
+        logger.info("%.1f ms\t%d rows\t%s\t%s%s", self.seconds * 1000, self.rows,
+                    self.sql, self.plan, f"\terror: {self.error}" if self.error else "")
+
+    def __str__(self):
+        return f"{self.seconds * 1000:8.1f} ms {self.rows:7d} rows  {self.sql[:120]}\n{'':26}{self.plan}"
+
+def plan_summary(conn: sqlite3.Connection, sql: str, params) -> str:
+    # EXPLAIN QUERY PLAN once per distinct statement text
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return ""
+    with _lock:
+        if sql in _plans:
+            return _plans[sql]
+    try:
+        # The base class method, so this lookup is not itself recorded
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        plan = "; ".join(r[-1] for r in rows)
+    except sqlite3.Error as e:
+        plan = f"(no plan: {e})"
+    with _lock:
+        _plans[sql] = plan
+    return plan
+
+class InstrumentedCursor(sqlite3.Cursor):
+    record: Optional[StatementRecord] = None
+
+    def _timed(self, call, *args):
+        record = self.record
+        if record is None or record.done:
+            return call(*args)
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            record.seconds += time.perf_counter() - start
+
+    def execute(self, sql, params=()):
+        if self.record is not None:
+            self.record.finish()
+            self.record = None
+        if not enabled:
+            return super().execute(sql, params)
+        record = StatementRecord(sql, plan_summary(self.connection, sql, params))
+        records.append(record)
+        self.record = record
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        except sqlite3.Error as e:
+            record.error = str(e)
+            record.finish()
+            raise
+        finally:
+            record.seconds += time.perf_counter() - start
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        self._count(1 if row is not None else 0, exhausted=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        self._count(len(rows), exhausted=len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._count(len(rows), exhausted=True)
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._count(0, exhausted=True)
+            raise
+        self._count(1)
+        return row
+
+    def close(self):
+        if self.record is not None:
+            self.record.finish()
+        super().close()
+
+    def __del__(self):
+        # Statements read with a single fetchone() are logged when the cursor goes
+        if self.record is not None:
+            self.record.finish()
+
+    def _count(self, rows: int, exhausted: bool = False):
+        if self.record is not None and not self.record.done:
+            self.record.rows += rows
+            if exhausted:
+                self.record.finish()
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        # sqlite3.Connection.execute bypasses cursor(); route it through
+        return self.cursor().execute(sql, params)
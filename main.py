@@ -1,35 +1,71 @@
 # main.py
 import sys
-import csv
-import json
+import time
+STARTED = time.perf_counter()
 import os
-import subprocess
+import sqlite3
 import threading
 from pathlib import Path
 from typing import Optional
 
-import requests
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLineEdit, QComboBox, QPushButton, QTableWidget, QTableWidgetItem,
+    QLineEdit, QComboBox, QPushButton, QTableView,
     QLabel, QHeaderView, QAbstractItemView, QProgressBar, QFileDialog, QStatusBar,
-    QMessageBox, QProgressDialog
+    QMessageBox, QProgressDialog, QDialog, QPlainTextEdit, QCheckBox, QDateEdit
 )
-from PySide6.QtCore import Qt, QThread, Signal, QTimer
+from PySide6.QtCore import (
+    Qt, QObject, QThread, Signal, QTimer, QAbstractTableModel, QModelIndex, QDate
+)
+from PySide6.QtGui import QShortcut, QKeySequence, QColor
 
-from database import search_tickets, export_tickets
+import backends
+import database
+from classifier import DEFAULT_RULES
+import instrument
+from config import load_config, update_config
+from replica import default_cache_dir
+from snapshot import load_snapshot, save_snapshot
 
 # ==================== AUTO-UPDATE CONFIG ====================
 GITHUB_REPO = "samdavidson-wdw/tos_lookup" 
 CURRENT_VERSION = "1.20"  
 # ===========================================================
 
+SEARCH_DEBOUNCE_MS = 250
+# Rows fetched per batch as the table is scrolled
+PAGE_SIZE = 100
+# Searches matching at most this many rows are kept in memory so that typing
+# more characters refines them without another query
+CANDIDATE_LIMIT = 2000
+# The date pickers' minimum date stands for "no limit" and shows as "Any"
+NO_DATE = QDate(2000, 1, 1)
+# Auto-refresh re-queries at most this many batches of the loaded rows; any
+# loaded below them are kept as they are
+AUTO_REFRESH_MAX_PAGES = 10
+# How long rows changed by an auto-refresh stay highlighted
+HIGHLIGHT_MS = 30000
+# The update check waits until the first results are on screen
+UPDATE_CHECK_DELAY_MS = 5000
+
+# Cold start milestones, in seconds since main.py began loading. Printed to
+# stderr when TOS_STARTUP_TRACE is set and listed in the diagnostics panel.
+startup_marks = []
+
+def startup_mark(label: str):
+    startup_marks.append((label, time.perf_counter() - STARTED))
+    if os.environ.get("TOS_STARTUP_TRACE"):
+        print(f"startup {startup_marks[-1][1] * 1000:8.1f} ms  {label}", file=sys.stderr)
+
+startup_mark("modules imported")
+
 class UpdateChecker(QThread):
     update_available = Signal(str, str)  # version, download_url
     no_update = Signal()
 
     def run(self):
         try:
+            import requests  # slow to import; only needed once the window is up
             response = requests.get(f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest", timeout=10)
             if response.status_code != 200:
                 self.no_update.emit()
@@ -58,6 +94,7 @@ class Downloader(QThread):
 
     def run(self):
         try:
+            import requests
             response = requests.get(self.url, stream=True)
             total = int(response.headers.get('content-length', 0))
             path = Path("update_installer.exe")
@@ -72,30 +109,432 @@ class Downloader(QThread):
         except Exception as e:
             self.error.emit(str(e))
 
+class TicketTableModel(QAbstractTableModel):
+    # One virtual list over the whole filtered result set. Rows arrive in
+    # PAGE_SIZE batches: when the view scrolls near the end it calls
+    # fetchMore, which asks the window for the next keyset page.
+    more_requested = Signal()
+
+    HEADERS = ["ID", "Assignee", "Description", "Status", "Created", "Type"]
+    KEYS = ["id", "assignee", "shortDescription", "status", "createdAt", "type"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tickets = []
+        self.total = 0
+        self.loading = False
+        self.stale = False  # showing the saved snapshot until the first query lands
+        self.changed = set()  # ids highlighted after an auto-refresh
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tickets)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.KEYS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ForegroundRole:
+            return QColor(Qt.gray) if self.stale else None
+        if role == Qt.BackgroundRole:
+            changed = self.changed and self.tickets[index.row()]["id"] in self.changed
+            return QColor(255, 200, 0, 70) if changed else None
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        value = self.tickets[index.row()][self.KEYS[index.column()]]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return self.HEADERS[section] if orientation == Qt.Horizontal else section + 1
+
+    def reset(self, tickets, total, stale=False):
+        self.beginResetModel()
+        self.tickets = list(tickets)
+        self.total = total
+        self.loading = False
+        self.stale = stale
+        self.changed = set()
+        self.endResetModel()
+
+    def append(self, tickets):
+        self.loading = False
+        if not tickets:
+            # Rows vanished since the count was taken; stop asking for more
+            self.total = len(self.tickets)
+            return
+        start = len(self.tickets)
+        self.beginInsertRows(QModelIndex(), start, start + len(tickets) - 1)
+        self.tickets.extend(tickets)
+        self.endInsertRows()
+
+    def patch(self, tickets, total, changed):
+        # Swaps in a re-queried copy of the loaded rows without a reset, so
+        # scroll position and selection follow the tickets they were on
+        old, new = len(self.tickets), len(tickets)
+        if new > old:
+            self.beginInsertRows(QModelIndex(), old, new - 1)
+            self.tickets.extend(tickets[old:])
+            self.endInsertRows()
+        elif new < old:
+            self.beginRemoveRows(QModelIndex(), new, old - 1)
+            del self.tickets[new:]
+            self.endRemoveRows()
+        self.layoutAboutToBeChanged.emit()
+        rows = {t["id"]: i for i, t in enumerate(tickets)}
+        for index in self.persistentIndexList():
+            row = rows.get(self.tickets[index.row()]["id"])
+            self.changePersistentIndex(
+                index, self.index(row, index.column()) if row is not None else QModelIndex())
+        self.tickets = list(tickets)
+        self.total = total
+        self.loading = False
+        self.changed = set(changed)
+        self.layoutChanged.emit()
+
+    def clear_changed(self):
+        if self.changed:
+            self.changed = set()
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(self.tickets) - 1, len(self.KEYS) - 1),
+                                  [Qt.BackgroundRole])
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.loading and len(self.tickets) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.loading = True
+            self.more_requested.emit()
+
+def sorts_after(ticket, cursor) -> bool:
+    # True if ticket comes after the (Created, Number) cursor in display order
+    created, number = ticket["createdAt"] or "", ticket["id"] or ""
+    last_created, last_number = cursor[0] or "", cursor[1] or ""
+    return created < last_created or (created == last_created and number > last_number)
+
+def filter_key(filters: dict) -> tuple:
+    # Compares filters the way the queries read them (search trimmed, any case)
+    return (filters["search"].strip().lower(), filters["status"] or "All",
+            filters["ticket_type"] or "All", filters["since"] or "", filters["until"] or "")
+
+def candidate_request(candidates, page: int) -> dict:
+    # The request a CandidateSet page answers, as the scheduler would send it
+    return {"search": candidates.search, "status": candidates.status,
+            "ticket_type": candidates.ticket_type, "since": candidates.since,
+            "until": candidates.until, "page": page}
+
 class SearchWorker(QThread):
-    finished = Signal(dict)
-    def __init__(self, search, status, page):
+    loaded = Signal(int, dict)  # generation, result
+    failed = Signal(int, str)
+
+    def __init__(self, generation, search, status, page, after=None, before=None,
+                 page_size=PAGE_SIZE, ticket_type="", since="", until="", patch=False):
         super().__init__()
+        self.generation = generation
+        self.patch = patch  # an auto-refresh of the rows already shown
         self.search = search
         self.status = status
+        self.ticket_type = ticket_type
+        self.since = since
+        self.until = until
         self.page = page
+        self.after = after
+        self.before = before
+        self.page_size = page_size
+        self.candidate_limit = CANDIDATE_LIMIT
+        self.conn = None
+        # Held while conn is set or cleared and while cancel() interrupts it,
+        # so a connection already back in the pool is never interrupted
+        self.conn_lock = threading.Lock()
+
+    def run(self):
+        try:
+            with database.get_connection() as conn:
+                with self.conn_lock:
+                    self.conn = conn
+                try:
+                    if self.isInterruptionRequested():
+                        return
+                    result = backends.active.search(
+                        self.search, self.status, self.page, self.page_size,
+                        after=self.after, before=self.before, conn=conn,
+                        candidate_limit=self.candidate_limit, ticket_type=self.ticket_type,
+                        since=self.since, until=self.until)
+                finally:
+                    with self.conn_lock:
+                        self.conn = None
+        except sqlite3.OperationalError as e:
+            if not self.isInterruptionRequested():
+                self.failed.emit(self.generation, str(e))
+            return
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
+            return
+        self.loaded.emit(self.generation, result)
+
+    def cancel(self):
+        # Stops the running statement; SQLite raises "interrupted" in run()
+        self.requestInterruption()
+        with self.conn_lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+class ExportWorker(QThread):
+    progress = Signal(int, int)  # rows written, expected total
+    done = Signal(int, str)      # rows written, path
+    failed = Signal(str)
+
+    def __init__(self, path, search, status, ticket_type="", since="", until="", total=0):
+        super().__init__()
+        self.path = path
+        self.search = search
+        self.status = status
+        self.ticket_type = ticket_type
+        self.since = since
+        self.until = until
+        self.total = total
+        self.conn = None
+        self.conn_lock = threading.Lock()  # as in SearchWorker
+
     def run(self):
-        result = search_tickets(self.search, self.status, self.page)
-        self.finished.emit(result)
+        import csv
+        written = 0
+        try:
+            with database.get_connection() as conn:
+                with self.conn_lock:
+                    self.conn = conn
+                try:
+                    with open(self.path, "w", newline="", encoding="utf-8") as f:
+                        writer = csv.writer(f)
+                        writer.writerow(TicketTableModel.HEADERS)
+                        for batch in backends.active.iter_export(
+                                self.search, self.status, conn=conn,
+                                ticket_type=self.ticket_type, since=self.since, until=self.until):
+                            if self.isInterruptionRequested():
+                                break
+                            writer.writerows([t[k] for k in TicketTableModel.KEYS] for t in batch)
+                            written += len(batch)
+                            self.progress.emit(written, self.total)
+                finally:
+                    with self.conn_lock:
+                        self.conn = None
+        except sqlite3.OperationalError as e:
+            if not self.isInterruptionRequested():
+                self.failed.emit(str(e))
+                return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if self.isInterruptionRequested():
+            # Don't leave a half-written export behind
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.failed.emit("cancelled")
+            return
+        self.done.emit(written, self.path)
+
+    def cancel(self):
+        self.requestInterruption()
+        with self.conn_lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+class ChangeWatcher(QThread):
+    # Polls the current database every interval seconds: a stat for the file
+    # mtime, and PRAGMA data_version on a connection kept open for it, which
+    # changes whenever another connection commits. Both only read file
+    # headers, so polling a share costs a round trip, not a query.
+    changed = Signal()
+
+    def __init__(self, interval: float, parent=None):
+        super().__init__(parent)
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+        self.wait()
+
+    def run(self):
+        conn = path = seen = None
+        while not self._stop.wait(self.interval):
+            try:
+                if path != database.DB_PATH:
+                    if conn is not None:
+                        conn.close()
+                    path = database.DB_PATH
+                    conn = sqlite3.connect(database.read_only_uri(path), uri=True)
+                current = (path, os.stat(path).st_mtime_ns,
+                           conn.execute("PRAGMA data_version").fetchone()[0])
+            except (OSError, sqlite3.Error):
+                if conn is not None:
+                    conn.close()
+                conn = path = None
+                continue
+            if seen is not None and current != seen:
+                self.changed.emit()
+            seen = current
+        if conn is not None:
+            conn.close()
+
+class SearchScheduler(QObject):
+    # Debounces search requests and keeps only the newest one alive: every
+    # request gets a generation number, superseded workers are interrupted
+    # and anything they still deliver is dropped.
+    loaded = Signal(dict, dict)  # request, result
+    failed = Signal(str)
+
+    def __init__(self, delay_ms: int = SEARCH_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self.pending = None
+        self.requests = {}
+        self.workers = set()  # referenced until the thread has exited
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.launch)
+
+    def schedule(self, request: dict, immediate: bool = False):
+        self.generation += 1
+        self.pending = request
+        self.cancel_running()
+        if immediate:
+            self.timer.stop()
+            self.launch()
+        else:
+            self.timer.start()
+
+    def busy(self) -> bool:
+        # A search is waiting out the debounce or its worker has not answered
+        return self.pending is not None or bool(self.requests)
+
+    def supersede(self):
+        # A result was produced without a worker; drop anything in flight
+        self.generation += 1
+        self.pending = None
+        self.timer.stop()
+        self.cancel_running()
+
+    def cancel_running(self):
+        for worker in self.workers:
+            worker.cancel()
+
+    def launch(self):
+        if self.pending is None:
+            return
+        request, self.pending = self.pending, None
+        worker = SearchWorker(self.generation, **request)
+        self.requests[self.generation] = request
+        worker.loaded.connect(self.on_loaded)
+        worker.failed.connect(self.on_failed)
+        worker.finished.connect(lambda w=worker: self.on_worker_done(w))
+        self.workers.add(worker)
+        worker.start()
+
+    def on_loaded(self, generation: int, result: dict):
+        request = self.requests.pop(generation, None)
+        if generation == self.generation and request is not None:
+            self.loaded.emit(request, result)
+
+    def on_failed(self, generation: int, message: str):
+        self.requests.pop(generation, None)
+        if generation == self.generation:
+            self.failed.emit(message)
+
+    def on_worker_done(self, worker):
+        self.requests.pop(worker.generation, None)
+        self.workers.discard(worker)
+        worker.deleteLater()
+
+class DiagnosticsDialog(QDialog):
+    # Hidden panel (Ctrl+Shift+D) listing the most recent SQL statements with
+    # their wall time, rows returned and query plan
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 500)
+        layout = QVBoxLayout(self)
+
+        self.record_box = QCheckBox("Record SQL timings")
+        self.record_box.setChecked(instrument.enabled)
+        self.record_box.toggled.connect(instrument.set_enabled)
+        layout.addWidget(self.record_box)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        layout.addWidget(self.text)
+
+        buttons = QHBoxLayout()
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(lambda: (instrument.records.clear(), self.refresh()))
+        buttons.addStretch()
+        buttons.addWidget(clear_btn)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        lines = [f"Database: {database.DB_PATH} ({backends.active.name} backend)"]
+        replica = self.window.replica
+        if replica and replica.scan_report:
+            lines.append("Replica plans still scanning tickets:")
+            lines += [f"  {scan}" for scan in replica.scan_report]
+        lines.append("Startup: " + ", ".join(f"{label} {t * 1000:.0f} ms" for label, t in startup_marks))
+        lines.append("")
+        lines += [str(r) for r in reversed(instrument.records)]
+        self.text.setPlainText("\n".join(lines))
 
 class MainWindow(QMainWindow):
+    replica_synced = Signal(bool, str)  # new copy taken, error message
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Tickets Dashboard")
         self.resize(1100, 700)
-        self.current_page = 1
-        self.total_pages = 1
+        self.current_page = 1  # batches loaded into the table
         self.last_search = ""
         self.last_status = "All"
+        self.last_type = "All"
+        self.last_since = ""
+        self.last_until = ""
+        self.last_stats = None
+        # Keyset cursor: (Created, Number) of the last row loaded
+        self.page_last = None
+        self.candidates = None  # every row of the last search, when small
+        self.search_scheduler = SearchScheduler(parent=self)
+        self.search_scheduler.loaded.connect(self.on_data_loaded)
+        self.search_scheduler.failed.connect(self.on_search_failed)
 
         # Theme
         self.config_path = Path("config.json")
+        self.config = load_config(self.config_path)
         self.dark_mode = self.load_theme()
+        database.result_cache.configure(self.config["cache"]["size"], self.config["cache"]["ttl"])
+        try:
+            database.set_ticket_rules(self.config["ticket_types"])
+            self.rules_error = ""
+        except ValueError as e:
+            database.set_ticket_rules(DEFAULT_RULES)
+            self.rules_error = f"ticket_types in config.json ignored, using the defaults: {e}"
+        diagnostics = self.config["diagnostics"]
+        instrument.configure_log(Path(diagnostics.get("log_path") or default_cache_dir() / "sql.log"))
+        instrument.set_enabled(diagnostics.get("enabled", False))
+        self.diagnostics = None
+        self.watcher = None
+        self.highlight_timer = QTimer(self)
+        self.highlight_timer.setSingleShot(True)
+        self.highlight_timer.setInterval(HIGHLIGHT_MS)
         self.styles = {
             "dark": Path(__file__).parent / "ui" / "style.qss",
             "light": Path(__file__).parent / "ui" / "light.qss"
@@ -103,22 +542,34 @@ class MainWindow(QMainWindow):
 
         self.init_ui()
         self.apply_theme()
-        self.check_for_updates()  # AUTO-UPDATE ON START
-        self.refresh()
+        self.snapshot_path = default_cache_dir() / "last_results.json"
+        self.restore_snapshot()
+        self.replica = None
+        self.painted = False
+        self.results_shown = False
+        startup_mark("window built")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            # Everything that touches the share or the network waits until
+            # the empty window is on screen
+            self.painted = True
+            startup_mark("first paint")
+            QTimer.singleShot(0, self.start_background)
+
+    def start_background(self):
+        self.start_backend()
+        self.refresh(immediate=True)
+        self.start_watcher()
+        QTimer.singleShot(UPDATE_CHECK_DELAY_MS, self.check_for_updates)  # AUTO-UPDATE ON START
 
     # === Theme Methods (unchanged) ===
     def load_theme(self) -> bool:
-        if self.config_path.exists():
-            try:
-                data = json.loads(self.config_path.read_text(encoding="utf-8"))
-                return data.get("dark_mode", True)
-            except:
-                return True
-        return True
+        return self.config.get("dark_mode", True)
 
     def save_theme(self):
-        data = {"dark_mode": self.dark_mode}
-        self.config_path.write_text(json.dumps(data), encoding="utf-8")
+        self.config = update_config(self.config_path, dark_mode=self.dark_mode)
 
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
@@ -132,6 +583,107 @@ class MainWindow(QMainWindow):
             self.setStyleSheet(path.read_text(encoding="utf-8"))
         self.theme_toggle.setChecked(self.dark_mode)
 
+    # === Last Results Snapshot ===
+    def remote_path(self) -> str:
+        return self.config.get("db_path") or database.REMOTE_DB_PATH
+
+    def restore_snapshot(self):
+        # Draw the last session's first page straight away, greyed out; the
+        # live query started after the first paint replaces it
+        snapshot = load_snapshot(self.snapshot_path, self.remote_path())
+        if snapshot is None:
+            return
+        filters = snapshot["filters"]
+        widgets = (self.search_input, self.status_combo, self.type_combo,
+                   self.since_edit, self.until_edit)
+        for widget in widgets:
+            widget.blockSignals(True)
+        self.search_input.setText(filters.get("search", ""))
+        for combo, value in ((self.status_combo, filters.get("status")),
+                             (self.type_combo, filters.get("ticket_type"))):
+            if (i := combo.findText(value or "All")) >= 0:
+                combo.setCurrentIndex(i)
+        for edit, value in ((self.since_edit, filters.get("since")),
+                            (self.until_edit, filters.get("until"))):
+            edit.setDate(QDate.fromString(value, "yyyy-MM-dd") if value else NO_DATE)
+        for widget in widgets:
+            widget.blockSignals(False)
+
+        tickets = snapshot["tickets"]
+        # total = rows held, so scrolling can't page past the snapshot
+        self.model.reset(tickets, len(tickets), stale=True)
+        self.show_stats(snapshot["stats"])
+        saved = time.strftime("%b %d %H:%M", time.localtime(snapshot["saved_at"]))
+        self.page_label.setText(f"Saved {saved}: {len(tickets)} of {snapshot['total']}")
+        self.status_bar.showMessage(f"Showing results saved {saved}, refreshing...")
+
+    def save_snapshot(self):
+        # First page only: it is what the next launch shows before querying
+        if self.model.stale or not self.results_shown:
+            return
+        try:
+            save_snapshot(
+                self.snapshot_path, self.remote_path(),
+                self.last_filters(),
+                self.model.tickets[:PAGE_SIZE], self.model.total, self.last_stats,
+            )
+        except OSError:
+            pass  # only costs the next launch its head start
+
+    # === Query Backend / Local Replica ===
+    def start_backend(self):
+        try:
+            backend = backends.create(self.config)
+        except (ValueError, RuntimeError) as e:
+            backend = backends.SQLiteBackend(self.remote_path())
+            self.status_bar.showMessage(f"Using the database directly: {e}", 5000)
+        self.replica = getattr(backend, "replica", None)
+        if self.replica:
+            self.replica_synced.connect(self.on_replica_synced)
+        # Called from the sync thread; the signal hops back to the GUI thread
+        backends.use_backend(backend, on_sync=lambda changed, error: self.replica_synced.emit(changed, error))
+
+    def on_replica_synced(self, changed: bool, error: str):
+        if error:
+            self.status_bar.showMessage(f"Replica sync failed, using {database.DB_PATH}: {error}", 5000)
+        elif changed and self.replica.delta:
+            added, updated, removed = self.replica.delta
+            self.status_bar.showMessage(
+                f"Local replica updated: {added} new, {updated} changed, {removed} removed", 3000)
+        elif changed:
+            scans = len(self.replica.scan_report)
+            note = f" ({scans} query plans still scan tickets)" if scans else ""
+            self.status_bar.showMessage(f"Local replica updated{note}", 3000)
+
+    def closeEvent(self, event):
+        self.save_snapshot()
+        if self.watcher:
+            self.watcher.stop()
+        backends.active.close()
+        super().closeEvent(event)
+
+    # === Auto-Refresh ===
+    def start_watcher(self):
+        settings = self.config["auto_refresh"]
+        if not settings.get("enabled"):
+            return
+        self.watcher = ChangeWatcher(settings.get("interval", 5), parent=self)
+        self.watcher.changed.connect(self.on_data_changed)
+        self.highlight_timer.timeout.connect(self.model.clear_changed)
+        self.watcher.start()
+
+    def on_data_changed(self):
+        # Re-run the shown query for the leading rows already loaded; a search
+        # the user started will show the new data anyway
+        if (self.model.stale or not self.results_shown or self.model.loading
+                or self.search_scheduler.busy() or self.search_scheduler.workers):
+            return
+        pages = min(max(1, self.current_page), AUTO_REFRESH_MAX_PAGES)
+        self.search_scheduler.schedule(
+            {**self.last_filters(), "page": 1, "page_size": pages * PAGE_SIZE, "patch": True},
+            immediate=True,
+        )
+
     # === AUTO-UPDATE ===
     def check_for_updates(self):
         self.update_checker = UpdateChecker()
@@ -177,6 +729,7 @@ class MainWindow(QMainWindow):
             self.install_update(installer_path)
 
     def install_update(self, installer_path: str):
+        import subprocess
         try:
             subprocess.Popen([installer_path, "/SILENT", "/CLOSEAPPLICATIONS"])
             QApplication.quit()
@@ -194,10 +747,27 @@ class MainWindow(QMainWindow):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search tickets...")
         self.search_input.returnPressed.connect(self.on_search)
+        self.search_input.textChanged.connect(self.on_filter_changed)
 
         self.status_combo = QComboBox()
-        self.status_combo.addItems(["All", "Resolved", "Assigned", "Pending", "Work in Progress", "Cancelled", "Closed"])
-        self.status_combo.currentTextChanged.connect(self.on_search)
+        self.status_combo.addItems(["All", *database.STATUS_FILTERS])
+        self.status_combo.currentTextChanged.connect(self.on_filter_changed)
+
+        self.type_combo = QComboBox()
+        self.type_combo.addItems(["All", *database.type_labels()])
+        self.type_combo.currentTextChanged.connect(self.on_filter_changed)
+
+        # From/To dates, both inclusive; the earliest date means no limit
+        self.since_edit = QDateEdit()
+        self.until_edit = QDateEdit()
+        for edit in (self.since_edit, self.until_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+            edit.setMinimumDate(NO_DATE)
+            edit.setSpecialValueText("Any")
+            edit.setDate(NO_DATE)
+            edit.setToolTip("Created on this day; pick the earliest date (Any) for no limit")
+            edit.dateChanged.connect(self.on_filter_changed)
 
         self.refresh_btn = QPushButton("Refresh")
         self.refresh_btn.clicked.connect(self.on_search)
@@ -205,6 +775,7 @@ class MainWindow(QMainWindow):
         self.export_btn = QPushButton("Export CSV")
         self.export_btn.setObjectName("exportBtn")
         self.export_btn.clicked.connect(self.export_csv)
+        self.export_worker = None
 
         self.theme_toggle = QPushButton()
         self.theme_toggle.setCheckable(True)
@@ -215,6 +786,12 @@ class MainWindow(QMainWindow):
         search_bar.addWidget(self.search_input, 1)
         search_bar.addWidget(QLabel("Status:"))
         search_bar.addWidget(self.status_combo)
+        search_bar.addWidget(QLabel("Type:"))
+        search_bar.addWidget(self.type_combo)
+        search_bar.addWidget(QLabel("From:"))
+        search_bar.addWidget(self.since_edit)
+        search_bar.addWidget(QLabel("To:"))
+        search_bar.addWidget(self.until_edit)
         search_bar.addWidget(self.refresh_btn)
         search_bar.addWidget(self.export_btn)
         search_bar.addWidget(QLabel("Theme:"))
@@ -236,28 +813,34 @@ class MainWindow(QMainWindow):
             self.stats_bar.addStretch()
         layout.addLayout(self.stats_bar)
 
+        # Per-type counts; only available once ticket_meta exists
+        self.type_stats_bar = QHBoxLayout()
+        self.type_stats_labels = {}
+        for label in database.type_labels():
+            lbl = QLabel()
+            self.type_stats_labels[label] = lbl
+            self.type_stats_bar.addWidget(QLabel(f"{label}:"))
+            self.type_stats_bar.addWidget(lbl)
+            self.type_stats_bar.addStretch()
+        layout.addLayout(self.type_stats_bar)
+
         # === Table ===
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["ID", "Assignee", "Description", "Status", "Created", "Type"])
+        self.model = TicketTableModel(self)
+        self.model.more_requested.connect(self.fetch_more)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         self.table.setAlternatingRowColors(True)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         layout.addWidget(self.table)
 
-        # === Pagination ===
+        # === Loaded rows ===
         pag_layout = QHBoxLayout()
         self.page_label = QLabel()
-        self.prev_btn = QPushButton("Prev")
-        self.next_btn = QPushButton("Next")
-        self.prev_btn.clicked.connect(lambda: self.go_page(self.current_page - 1))
-        self.next_btn.clicked.connect(lambda: self.go_page(self.current_page + 1))
-
         pag_layout.addWidget(self.page_label)
         pag_layout.addStretch()
-        pag_layout.addWidget(self.prev_btn)
-        pag_layout.addWidget(self.next_btn)
         layout.addLayout(pag_layout)
 
         # === Progress & Status ===
@@ -270,8 +853,16 @@ class MainWindow(QMainWindow):
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
 
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.show_diagnostics)
+
         QTimer.singleShot(100, self.update_toggle_style)
 
+    def show_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(self)
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
     def update_toggle_style(self):
         self.theme_toggle.setStyleSheet(self.get_toggle_style())
 
@@ -301,69 +892,189 @@ class MainWindow(QMainWindow):
 
     # === Search & Pagination ===
     def on_search(self):
-        self.current_page = 1
-        self.refresh()
+        # Enter / Refresh always go back to the database
+        self.candidates = None
+        self.refresh(immediate=True)
 
-    def go_page(self, page):
-        self.current_page = max(1, page)
+    def on_filter_changed(self):
         self.refresh()
 
-    def refresh(self):
-        search = self.search_input.text()
-        status = self.status_combo.currentText()
-        self.last_search, self.last_status = search, status
+    def fetch_more(self):
+        # The view scrolled to the end of what is loaded
+        page = self.current_page + 1
+        if self.search_scheduler.busy():
+            # A new search or refresh is on its way and will replace the rows;
+            # scheduling the next batch of the old ones would cancel it
+            self.model.loading = False
+            return
+        if self.candidates:
+            # Straight from memory; nothing in flight to supersede
+            self.on_data_loaded(candidate_request(self.candidates, page),
+                                self.candidates.result(page, PAGE_SIZE))
+            return
+        self.search_scheduler.schedule(
+            {**self.last_filters(), "page": page, "after": self.page_last},
+            immediate=True,
+        )
+        self.progress.show()
+
+    def picked_date(self, edit) -> str:
+        date = edit.date()
+        return "" if date == NO_DATE else date.toString("yyyy-MM-dd")
+
+    def last_filters(self) -> dict:
+        # Filters of the results on screen, as SearchWorker keyword arguments
+        return {"search": self.last_search, "status": self.last_status,
+                "ticket_type": self.last_type, "since": self.last_since,
+                "until": self.last_until}
 
+    def widget_filters(self) -> dict:
+        # Filters as picked in the search bar, in last_filters() form
+        return {"search": self.search_input.text(), "status": self.status_combo.currentText(),
+                "ticket_type": self.type_combo.currentText(),
+                "since": self.picked_date(self.since_edit),
+                "until": self.picked_date(self.until_edit)}
+
+    def refresh(self, immediate: bool = False):
+        filters = self.widget_filters()
+        if self.candidates and self.candidates.covers(**filters):
+            self.show_candidates(self.candidates.refine(**filters), 1)
+            return
         self.progress.setMaximum(0)
         self.progress.show()
-        self.worker = SearchWorker(search, status, self.current_page)
-        self.worker.finished.connect(self.on_data_loaded)
-        self.worker.start()
+        self.search_scheduler.schedule({**filters, "page": 1}, immediate=immediate)
+
+    def show_candidates(self, candidates, page: int):
+        # A new search answered from memory replaces whatever is in flight
+        self.search_scheduler.supersede()
+        self.on_data_loaded(candidate_request(candidates, page), candidates.result(page, PAGE_SIZE))
 
-    def on_data_loaded(self, data):
+    def on_search_failed(self, message: str):
         self.progress.hide()
+        self.model.loading = False
+        self.status_bar.showMessage(f"Search failed: {message}", 5000)
+
+    def on_data_loaded(self, request, data):
+        if request.get("patch"):
+            self.on_data_patched(request, data)
+            return
+        if request["page"] > 1 and filter_key(request) != filter_key(self.widget_filters()):
+            # More rows for filters the user has since changed; the search
+            # for the new ones replaces the table
+            self.progress.hide()
+            self.model.loading = False
+            return
+        self.progress.hide()
+        self.current_page = request["page"]
+        self.last_search, self.last_status = request["search"], request["status"]
+        self.last_type = request["ticket_type"]
+        self.last_since, self.last_until = request["since"], request["until"]
+        self.candidates = data.get("candidates")
         tickets = data["tickets"]
         total = data["total"]
         stats = data["stats"]
 
-        self.total_pages = max(1, (total + 49) // 50)
-        self.page_label.setText(f"Page {self.current_page} of {self.total_pages}")
-        self.prev_btn.setEnabled(self.current_page > 1)
-        self.next_btn.setEnabled(self.current_page < self.total_pages)
+        if self.current_page == 1:
+            self.page_last = data["last"]
+            self.model.reset(tickets, total)
+            self.last_stats = stats
+            if not self.results_shown:
+                self.results_shown = True
+                startup_mark("first results")
+            self.table.scrollToTop()
+            self.save_snapshot()
+        else:
+            self.page_last = data["last"] or self.page_last
+            self.model.append(tickets)
+        loaded = self.model.rowCount()
+        self.page_label.setText(f"Loaded {loaded} of {total}")
+        self.show_stats(stats)
+        self.status_bar.showMessage(f"Showing {loaded} of {total} tickets")
+        if self.rules_error:
+            # Once, over the first results, so it is not lost behind them
+            self.status_bar.showMessage(self.rules_error, 15000)
+            self.rules_error = ""
 
+    def on_data_patched(self, request, data):
+        head = data["tickets"]
+        old = {t["id"]: t for t in self.model.tickets}
+        changed = [t["id"] for t in head if old.get(t["id"]) != t]
+        tickets = head
+        if len(head) == request["page_size"] and data["last"]:
+            # Only the leading rows were re-queried: keep the loaded rows
+            # below them rather than drop what the user scrolled to
+            ids = {t["id"] for t in head}
+            tickets = head + [t for t in self.model.tickets
+                              if t["id"] not in ids and sorts_after(t, data["last"])]
+        # Paging carries on after the last row now loaded
+        self.current_page = max(1, -(-len(tickets) // PAGE_SIZE))
+        self.candidates = data.get("candidates")
+        self.page_last = [tickets[-1]["createdAt"], tickets[-1]["id"]] if tickets else None
+        self.last_stats = data["stats"]
+        # Keep the ticket at the top of the view there, unless the view is at
+        # the top, where new tickets should come into sight
+        top = self.table.rowAt(0)
+        anchor = self.model.tickets[top]["id"] if top > 0 else None
+        self.model.patch(tickets, data["total"], changed)
+        if anchor is not None:
+            row = next((i for i, t in enumerate(tickets) if t["id"] == anchor), None)
+            if row is not None:
+                self.table.scrollTo(self.model.index(row, 0), QAbstractItemView.PositionAtTop)
+        self.page_label.setText(f"Loaded {self.model.rowCount()} of {data['total']}")
+        self.show_stats(data["stats"])
+        if changed:
+            self.highlight_timer.start()
+            self.status_bar.showMessage(f"{len(changed)} tickets new or updated", 5000)
+            self.save_snapshot()
+
+    def show_stats(self, stats):
         for key in self.stats_labels:
             value = stats.get(key, 0)
             self.stats_labels[key].setText(f"<b>{value}</b>")
-
-        self.table.setRowCount(len(tickets))
-        for i, t in enumerate(tickets):
-            self.table.setItem(i, 0, QTableWidgetItem(t["id"]))
-            self.table.setItem(i, 1, QTableWidgetItem(t["assignee"]))
-            self.table.setItem(i, 2, QTableWidgetItem(t["shortDescription"]))
-            self.table.setItem(i, 3, QTableWidgetItem(t["status"]))
-            self.table.setItem(i, 4, QTableWidgetItem(t["createdAt"]))
-            self.table.setItem(i, 5, QTableWidgetItem(t["type"]))
-
-        self.status_bar.showMessage(f"Showing {len(tickets)} of {total} tickets")
+        for label, lbl in self.type_stats_labels.items():
+            value = stats["types"].get(label)
+            lbl.setText(f"<b>{value}</b>" if value is not None else "–")
 
     def export_csv(self):
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            return
         path, _ = QFileDialog.getSaveFileName(
             self, "Export Tickets", "tickets_export.csv", "CSV Files (*.csv)"
         )
         if not path:
             return
-        try:
-            tickets = export_tickets(self.last_search, self.last_status)
-            with open(path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["ID", "Assignee", "Description", "Status", "Created", "Type"])
-                for t in tickets:
-                    writer.writerow([
-                        t["id"], t["assignee"], t["shortDescription"],
-                        t["status"], t["createdAt"], t["type"]
-                    ])
-            self.status_bar.showMessage(f"Exported {len(tickets)} tickets to {path}", 5000)
-        except Exception as e:
-            self.status_bar.showMessage(f"Export failed: {e}")
+        self.export_worker = ExportWorker(
+            path, self.last_search, self.last_status, self.last_type,
+            self.last_since, self.last_until, self.model.total
+        )
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.done.connect(self.on_export_done)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_btn.setText("Cancel Export")
+        self.status_bar.showMessage("Exporting...")
+        self.export_worker.start()
+
+    def on_export_progress(self, written: int, total: int):
+        if total:
+            self.status_bar.showMessage(f"Exporting... {written:,} of {total:,} tickets")
+        else:
+            self.status_bar.showMessage(f"Exporting... {written:,} tickets")
+
+    def on_export_done(self, written: int, path: str):
+        self.status_bar.showMessage(f"Exported {written} tickets to {path}", 5000)
+
+    def on_export_failed(self, message: str):
+        if message == "cancelled":
+            self.status_bar.showMessage("Export cancelled", 5000)
+        else:
+            self.status_bar.showMessage(f"Export failed: {message}")
+
+    def on_export_finished(self):
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self.export_btn.setText("Export CSV")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,186 @@
+# memstore.py
+import re
+import sqlite3
+from typing import Any, Dict
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the in-memory engine needs it
+    np = None
+
+import database
+
+
+# In MemoryStore.text: any run of bytes within a row, and one UTF-8 character
+ROW_ANY = rb"[^\x01]*"
+ROW_CHAR = rb"(?:[^\x01\x80-\xff]|[\xc0-\xff][\x80-\xbf]*)"
+
+def like_pattern(search: str):
+    # SQL LIKE '%search%' (case-insensitive, % and _ wildcards) as a regex
+    # over MemoryStore.text; the wildcards never run past the end of a row
+    parts = [ROW_ANY if c == "%" else ROW_CHAR if c == "_" else re.escape(c.lower().encode("utf-8"))
+             for c in search]
+    return re.compile(b"".join(parts))
+
+def object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def timestamps(values):
+    # "YYYY-MM-DD[ HH:MM:SS]" text -> int64 seconds; raises ValueError otherwise
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+# Every ticket held as columns, in display order (Created DESC, Number ASC),
+# so any filter is a boolean mask whose True positions are already sorted.
+# State and type are dictionary-encoded, Created is int64 seconds, and the
+# searchable text is one UTF-8 buffer of lower-cased rows with an offset per
+# row, so no row is padded to the longest one. search_tickets() answers
+# exactly like database.search_tickets() without touching SQLite.
+class MemoryStore:
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("the in-memory store needs numpy (pip install numpy)")
+        self.version = None
+        self.size = 0
+
+    def load(self, conn: sqlite3.Connection = None):
+        with database.connection_or_pooled(conn) as conn:
+            version = database.data_version(conn)
+            select, clause, params, _ = database.prepare_query(conn, "", "All")
+            rows = conn.execute(f"{select} {clause} {database.PAGE_ORDER}", params).fetchall()
+        columns = [list(c) for c in zip(*rows)] or [[] for _ in range(6)]
+        del rows
+        numbers, callers, descs, states, created, types = columns
+
+        # Returned as read, so kept as the original objects rather than
+        # fixed-width (padded) strings
+        self.numbers = object_array(numbers)
+        self.callers = object_array(callers)
+        self.descs = object_array(descs)
+        self.created = object_array(created)
+        self.created_ts = timestamps(created)
+        # \0 keeps a match from spanning the description and the number;
+        # \1 ends each row
+        texts = [f"{(d or '').lower()}\0{(n or '').lower()}\1".encode("utf-8")
+                 for d, n in zip(descs, numbers)]
+        self.offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=self.offsets[1:])
+        self.text = b"".join(texts)
+        self.buffer = np.frombuffer(self.text, dtype=np.uint8)
+        del texts
+
+        self.state_values, state_codes = np.unique(np.array([s or "" for s in states], dtype=str),
+                                                   return_inverse=True)
+        self.state_codes = state_codes.astype(np.int32)
+        self.categories = sorted({*database.STATUS_FILTERS.values(), "other"})
+        state_category = np.array(
+            [self.categories.index(database.status_category(s)) for s in self.state_values],
+            dtype=np.int32)
+        self.category_codes = state_category[self.state_codes]
+
+        self.type_values, type_codes = np.unique(np.array([t or "" for t in types], dtype=str),
+                                                 return_inverse=True)
+        self.type_codes = type_codes.astype(np.int32)
+        self.size = len(numbers)
+        self.version = version
+
+    def rows_at(self, positions):
+        # Mask of the rows holding these byte positions of text
+        rows = np.zeros(self.size, dtype=bool)
+        rows[np.searchsorted(self.offsets, positions, side="right") - 1] = True
+        return rows
+
+    def contains(self, search: str):
+        # Rows whose text holds search: candidates are the positions whose
+        # first and last bytes fit, narrowed by the bytes between, all in numpy
+        needle = np.frombuffer(search.lower().encode("utf-8"), dtype=np.uint8)
+        buf, width = self.buffer, len(needle)
+        if len(buf) < width:
+            return np.zeros(self.size, dtype=bool)
+        end = len(buf) - width + 1
+        starts = np.flatnonzero((buf[:end] == needle[0]) & (buf[width - 1:] == needle[-1]))
+        for k in range(1, width - 1):
+            starts = starts[buf[starts + k] == needle[k]]
+        return self.rows_at(starts)
+
+    def matches(self, pattern):
+        # Rows matching a like_pattern(); each match runs on to the end of
+        # its row so a row is only reported once
+        pattern = re.compile(pattern.pattern + ROW_ANY)
+        return self.rows_at([m.start() for m in pattern.finditer(self.text)])
+
+    def mask(self, search: str, status: str, ticket_type: str = "",
+             since: str = "", until: str = ""):
+        keep = np.ones(self.size, dtype=bool)
+        if status in database.STATUS_FILTERS:
+            wanted = self.categories.index(database.STATUS_FILTERS[status])
+            keep &= self.category_codes == wanted
+        elif status and status != "All":
+            wanted = status.lower()
+            codes = [i for i, s in enumerate(self.state_values) if wanted in s.lower()]
+            keep &= np.isin(self.state_codes, codes)
+        if ticket_type and ticket_type != "All":
+            value = database.type_value(ticket_type)
+            code = np.searchsorted(self.type_values, value)
+            if code < len(self.type_values) and self.type_values[code] == value:
+                keep &= self.type_codes == code
+            else:
+                keep[:] = False
+        if since:
+            keep &= self.created_ts >= timestamps([since])[0]
+        if until:
+            keep &= self.created_ts < timestamps([database.day_after(until)])[0]
+        if search := search.strip():
+            if any(c in search for c in "%_"):
+                keep &= self.matches(like_pattern(search))
+            else:
+                keep &= self.contains(search)
+        return keep
+
+    def stats(self, idx) -> Dict[str, Any]:
+        ntypes = len(self.type_values)
+        counts = np.bincount(self.category_codes[idx] * ntypes + self.type_codes[idx],
+                             minlength=len(self.categories) * ntypes)
+        groups = [(self.categories[code // ntypes], str(self.type_values[code % ntypes]),
+                   int(counts[code])) for code in np.flatnonzero(counts)]
+        return database.stats_from_groups(groups, with_types=True)
+
+    def row(self, i: int):
+        # Same column order as database.prepare_query()
+        return (self.numbers[i], self.callers[i], self.descs[i],
+                str(self.state_values[self.state_codes[i]]), self.created[i],
+                str(self.type_values[self.type_codes[i]]))
+
+    def search_tickets(self, search: str, status: str, page: int, page_size: int = 50,
+                       after=None, before=None, candidate_limit: int = 0,
+                       ticket_type: str = "", since: str = "", until: str = ""):
+        # candidate_limit is accepted for interface parity; every row is
+        # already in memory, so there is nothing to keep candidates for
+        idx = np.flatnonzero(self.mask(search, status, ticket_type, since, until))
+        stats = self.stats(idx)
+        if after is not None or before is not None:
+            created, number = after if after is not None else before
+            ts = timestamps([created])[0]
+            # Number only breaks ties on Created, so only those rows compare it
+            same = self.created_ts[idx] == ts
+            numbers = np.array([n or "" for n in self.numbers[idx[same]]], dtype=object)
+            if after is not None:
+                later = self.created_ts[idx] < ts
+                later[same] = numbers > number
+                page_idx = idx[later][:page_size]
+            else:
+                earlier = self.created_ts[idx] > ts
+                earlier[same] = numbers < number
+                page_idx = idx[earlier][-page_size:] if page_size else idx[:0]
+        else:
+            start = (max(1, page) - 1) * page_size
+            page_idx = idx[start:start + page_size]
+        rows = [self.row(i) for i in page_idx]
+        return database.page_result(rows, stats)
+
+    def iter_export(self, search: str, status: str, batch_size: int = 1000,
+                    ticket_type: str = "", since: str = "", until: str = ""):
+        idx = np.flatnonzero(self.mask(search, status, ticket_type, since, until))
+        for start in range(0, len(idx), batch_size):
+            yield [database.ticket_from_row(self.row(i)) for i in idx[start:start + batch_size]]
@@ -0,0 +1,80 @@
+# migrations.py
+import itertools
+import sqlite3
+import sys
+from typing import Callable, List, Tuple
+
+import database
+
+
+# Every step is idempotent and run on each bootstrap: a fresh replica copy
+# arrives with whatever indexes the report job happened to create, and a
+# long-lived local store only pays for the steps it is missing.
+def create_index(name: str, columns: str) -> Callable[[sqlite3.Connection], None]:
+    def step(conn: sqlite3.Connection):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON tickets ({columns})")
+        conn.commit()
+    return step
+
+STEPS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("Created/Number page index", database.ensure_page_index),
+    ("State index", create_index("idx_tickets_state", "State")),
+    ("Number index", create_index("idx_tickets_number", "Number")),
+    ("search index", database.ensure_search_index),
+    ("ticket type/status table", database.ensure_ticket_meta),
+]
+
+def bootstrap(conn: sqlite3.Connection) -> List[str]:
+    # Brings a writable copy up to what the app's queries need, refreshes the
+    # planner statistics and returns the plans that still scan a table
+    conn.create_function("ticket_type", 1, database.get_ticket_type, deterministic=True)
+    for _, step in STEPS:
+        step(conn)
+    conn.execute("PRAGMA analysis_limit = 1000")  # sample, don't read every row
+    conn.execute("ANALYZE")
+    conn.commit()
+    return full_scans(conn)
+
+def representative_queries(conn: sqlite3.Connection):
+    # (label, sql, params) for the statements search_tickets/iter_export issue
+    cases = itertools.product(("", "ap down"), ("All", "Pending"), ("", "ONT"), ("", "2024-01-01"))
+    for search, status, ticket_type, since in cases:
+        select, clause, params, meta = database.prepare_query(conn, search, status,
+                                                              ticket_type, since)
+        label = f"search={search!r} status={status} type={ticket_type or 'All'}"
+        if since:
+            label += f" since={since}"
+        if search or status != "All" or ticket_type or since:
+            # Counting every ticket has to read them all; no index helps that
+            stats_clause, stats_params, _ = database.prepare_stats(conn, search, status,
+                                                                   ticket_type, since)
+            yield f"stats {label}", database.stats_sql(stats_clause, meta), stats_params
+        yield f"page {label}", database.page_sql(select, clause), params + [50, 0]
+        yield (f"next page {label}", database.page_sql(select, clause, "after"),
+               params + ["", "", "", 50])
+
+def full_scans(conn: sqlite3.Connection) -> List[str]:
+    # Plans that read every ticket, and page plans that sort every match
+    # before LIMIT instead of walking the page index. Text searches always
+    # sort: the trigram index returns matches in rowid order, and there are
+    # only as many as match, so those sorts are not reported.
+    report = []
+    for label, sql, params in representative_queries(conn):
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        text_search = any("VIRTUAL TABLE" in detail for detail in plan)
+        for detail in plan:
+            # Index-order scans stop at LIMIT and the FTS "scan" is an index
+            # probe; only a bare SCAN reads the whole table
+            if detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail:
+                report.append(f"{label}: {detail}")
+            elif ("page" in label and "TEMP B-TREE FOR" in detail and "ORDER BY" in detail
+                  and not text_search):
+                report.append(f"{label}: {detail}")
+    return report
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python migrations.py <writable copy of tickets.db>")
+    with sqlite3.connect(sys.argv[1]) as conn:
+        scans = bootstrap(conn)
+    print("\n".join(scans) if scans else "No full table scans or sorts in the app's query plans.")
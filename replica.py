@@ -0,0 +1,275 @@
+# replica.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import database
+import migrations
+
+
+# One row per local ticket with a hash of all its columns, so a delta sync
+# finds every changed ticket (any State, any column) by comparing hashes
+# instead of rows
+HASH_TABLE = "ticket_sync"
+
+# Status categories a ticket rarely leaves. Delta syncs only compare the other
+# tickets with the share; these are compared on the full check, which reads
+# every row of the share and so runs at most once per FULL_CHECK_INTERVAL.
+SETTLED_STATUSES = ("closed", "cancelled")
+FULL_CHECK_INTERVAL = 24 * 3600
+
+def row_hash(*values) -> int:
+    # Signed 64-bit, so SQLite stores it as a plain INTEGER
+    blob = json.dumps(values, default=str).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(blob, digest_size=8).digest(), "big", signed=True)
+
+def ticket_columns(conn: sqlite3.Connection, schema: str = "main"):
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info(tickets)")]
+
+def hash_expression(columns, alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+    return f"row_hash({', '.join(prefix + c for c in columns)})"
+
+def store_hashes(conn: sqlite3.Connection):
+    # Hashes every local ticket that has none yet (all of them on a new copy)
+    conn.create_function("row_hash", -1, row_hash, deterministic=True)
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {HASH_TABLE} (
+        ticket_rowid INTEGER PRIMARY KEY, hash INTEGER NOT NULL)""")
+    conn.execute(f"""
+        INSERT INTO {HASH_TABLE} (ticket_rowid, hash)
+        SELECT rowid, {hash_expression(ticket_columns(conn))} FROM tickets
+        WHERE rowid NOT IN (SELECT ticket_rowid FROM {HASH_TABLE})
+    """)
+    # A fresh copy matches the share, so the next full check is a day away
+    database.set_state(conn, "sync_full_check", time.time())
+    conn.commit()
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("LOCALAPPDATA") or Path.home() / ".cache"
+    return Path(base) / "tos_lookup"
+
+# Local read-through copy of tickets.db. The remote file is only copied
+# again when its size or mtime changes, and each copy gets a new file name so
+# connections still open on the old one (Windows will not replace an open
+# file) keep working until they move on.
+class Replica:
+
+    def __init__(self, remote_path: str, cache_dir: Optional[Path] = None, interval: int = 300):
+        self.remote_path = str(remote_path)
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.interval = interval
+        self.state_path = self.cache_dir / "replica.json"
+        self.scan_report = []  # plans still doing full scans, from migrations
+        self.delta = None  # (added, changed, removed) by the last delta sync
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def local_path(self) -> Optional[Path]:
+        name = self.load_state().get("file")
+        if name and (self.cache_dir / name).exists():
+            return self.cache_dir / name
+        return None
+
+    def sync(self) -> bool:
+        # Returns True when a fresh copy was taken
+        st = os.stat(self.remote_path)
+        state = self.load_state()
+        current = self.local_path()
+        if current and state.get("size") == st.st_size and state.get("mtime_ns") == st.st_mtime_ns:
+            reclassified = self.reclassify(current)
+            database.use_database(current)
+            return reclassified
+
+        if current and (delta := self.sync_delta(current)) is not None:
+            self.delta = delta
+            self.write_state(current.name, st)
+            self.reclassify(current)
+            database.use_database(current)
+            return True
+
+        self.delta = None
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        name = f"tickets-{st.st_mtime_ns}.db"
+        tmp = self.cache_dir / (name + ".part")
+        if tmp.exists():
+            tmp.unlink()
+        # The backup API takes a consistent snapshot even if the report job
+        # is writing while we copy, which a plain file copy would tear.
+        src = sqlite3.connect(self.remote_path)
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst)
+            self.scan_report = migrations.bootstrap(dst)
+            store_hashes(dst)
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp, self.cache_dir / name)
+
+        self.write_state(name, st)
+        database.use_database(self.cache_dir / name)
+        self.cleanup(keep=name)
+        return True
+
+    def reclassify(self, local: Path) -> bool:
+        # Redoes ticket types in place when the rules changed since the copy
+        # was classified; True if it did
+        conn = sqlite3.connect(str(local), timeout=30)
+        try:
+            if database.has_ticket_meta(conn):
+                return False
+            database.ensure_ticket_meta(conn)
+            self.delta = None
+            return True
+        finally:
+            conn.close()
+
+    def write_state(self, name: str, st: os.stat_result):
+        self.state_path.write_text(json.dumps({
+            "file": name, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+        }), encoding="utf-8")
+
+    def sync_delta(self, local: Path):
+        # Brings the local copy up to date in place: tickets above the rowid
+        # watermark are appended, and tickets that can still change (all of
+        # them, by row hash, on a full check) are compared with the share and
+        # updated or removed. Everything lands in one transaction. Returns
+        # (added, changed, removed), or None when only a full copy will do.
+        conn = sqlite3.connect(str(local), uri=True, timeout=30)
+        try:
+            conn.execute("ATTACH DATABASE ? AS remote", (database.read_only_uri(self.remote_path),))
+            try:
+                return self.apply_delta(conn)
+            except sqlite3.Error:
+                conn.rollback()
+                return None
+            finally:
+                conn.execute("DETACH DATABASE remote")
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+
+    def apply_delta(self, conn: sqlite3.Connection):
+        columns = ticket_columns(conn)
+        if columns != ticket_columns(conn, "remote"):
+            return None  # the report job changed the table
+        if not all(database.has_table(conn, t) for t in (database.META_TABLE, HASH_TABLE)):
+            return None  # not a bootstrapped copy, or one from before row hashes
+        watermark = database.get_state(conn, "sync_rowid")
+        if watermark is None:
+            watermark = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM main.tickets").fetchone()[0]
+        remote_max = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM remote.tickets").fetchone()[0]
+        if remote_max < watermark:
+            return None  # table rebuilt on the share; rowids no longer line up
+
+        # Each sync compares only the tickets that can still change, column by
+        # column against the local row (one rowid lookup each, no Python per
+        # row); once every FULL_CHECK_INTERVAL the stored row hashes are
+        # compared for every ticket instead
+        now = time.time()
+        full = now - float(database.get_state(conn, "sync_full_check", 0)) >= FULL_CHECK_INTERVAL
+        if full:
+            checked, params = f"SELECT ticket_rowid FROM main.{HASH_TABLE}", ()
+        else:
+            marks = ", ".join("?" * len(SETTLED_STATUSES))
+            checked = (f"SELECT ticket_rowid FROM main.{database.META_TABLE} "
+                       f"WHERE status NOT IN ({marks})")
+            params = SETTLED_STATUSES
+
+        conn.create_function("row_hash", -1, row_hash, deterministic=True)
+        cols = ", ".join(columns)
+        removed = [r[0] for r in conn.execute(f"""
+            SELECT h.ticket_rowid FROM main.{HASH_TABLE} h
+            WHERE h.ticket_rowid IN ({checked})
+            AND NOT EXISTS (SELECT 1 FROM remote.tickets r WHERE r.rowid = h.ticket_rowid)
+        """, params)]
+        # CROSS JOIN keeps the local rows outermost: one remote lookup each
+        if full:
+            changed = [r[0] for r in conn.execute(f"""
+                SELECT h.ticket_rowid
+                FROM main.{HASH_TABLE} h CROSS JOIN remote.tickets r ON r.rowid = h.ticket_rowid
+                WHERE {hash_expression(columns, "r")} != h.hash
+            """)]
+        else:
+            differs = " OR ".join(f"r.{c} IS NOT l.{c}" for c in columns)
+            changed = [r[0] for r in conn.execute(f"""
+                SELECT l.rowid FROM main.tickets l CROSS JOIN remote.tickets r ON r.rowid = l.rowid
+                WHERE l.rowid IN ({checked}) AND ({differs})
+            """, params)]
+
+        for table, key in (("tickets", "rowid"), (database.META_TABLE, "ticket_rowid"),
+                           (HASH_TABLE, "ticket_rowid")):
+            conn.executemany(f"DELETE FROM main.{table} WHERE {key} = ?", [(r,) for r in removed])
+        conn.executemany(f"""
+            UPDATE main.tickets SET ({cols}) = (SELECT {cols} FROM remote.tickets r
+                                                WHERE r.rowid = main.tickets.rowid)
+            WHERE rowid = ?
+        """, [(r,) for r in changed])
+        conn.executemany(f"""
+            UPDATE main.{HASH_TABLE} SET hash = (SELECT {hash_expression(columns)}
+                                                 FROM main.tickets WHERE rowid = ticket_rowid)
+            WHERE ticket_rowid = ?
+        """, [(r,) for r in changed])
+        # Above the watermark (a rowid range seek); the full check also picks
+        # up any rowid the share reused below it
+        reused = f" OR rowid NOT IN (SELECT ticket_rowid FROM main.{HASH_TABLE})" if full else ""
+        added = conn.execute(f"""
+            INSERT INTO main.tickets (rowid, {cols})
+            SELECT rowid, {cols} FROM remote.tickets WHERE rowid > ?{reused} ORDER BY rowid
+        """, (watermark,)).rowcount
+        new = [r[0] for r in conn.execute(f"SELECT rowid FROM main.tickets WHERE rowid > ?{reused}",
+                                          (watermark,))]
+        conn.executemany(f"""
+            INSERT INTO main.{HASH_TABLE} (ticket_rowid, hash)
+            SELECT rowid, {hash_expression(columns)} FROM main.tickets WHERE rowid = ?
+        """, [(r,) for r in new])
+        database.set_state(conn, "sync_rowid", max(watermark, remote_max))
+        if full:
+            database.set_state(conn, "sync_full_check", now)
+        # Classifies the new and changed tickets and commits the lot; a rules
+        # change is redone by reclassify() once this has committed
+        database.update_ticket_meta(conn, rowids=changed + new)
+        return added, len(changed), len(removed)
+
+    def cleanup(self, keep: str):
+        for old in self.cache_dir.glob("tickets-*.db"):
+            if old.name != keep:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass  # still open somewhere; next sync retries
+
+    def start(self, on_sync: Optional[Callable[[bool, str], None]] = None):
+        # Fall back to the last good copy straight away if the share is slow
+        # or unreachable; the first sync below replaces it when it can.
+        if current := self.local_path():
+            database.use_database(current)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(on_sync,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, on_sync):
+        while not self._stop.is_set():
+            try:
+                changed = self.sync()
+                if on_sync:
+                    on_sync(changed, "")
+            except (OSError, sqlite3.Error) as e:
+                if on_sync:
+                    on_sync(False, str(e))
+            self._stop.wait(self.interval)
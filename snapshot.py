@@ -0,0 +1,46 @@
+# snapshot.py
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from database import TICKET_KEYS, ticket_from_row
+
+
+# Bump when the file layout changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+
+
+# The last page the dashboard showed, with its stats and filters, so the next
+# launch can draw it before the first query returns. Tickets are stored as
+# rows rather than dicts to keep the file small; the candidate set is never
+# saved.
+def save_snapshot(path: Path, source: str, filters: Dict[str, str], tickets, total: int,
+                  stats: Dict[str, Any]):
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "source": source,
+        "filters": filters,
+        "rows": [[t[k] for k in TICKET_KEYS] for t in tickets],
+        "total": total,
+        "stats": stats,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)  # a crash mid-write never leaves a torn snapshot
+
+def load_snapshot(path: Path, source: str) -> Optional[Dict[str, Any]]:
+    # None when missing, unreadable, from another version or another database
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+    if data.get("source") != source:
+        return None
+    data["tickets"] = [ticket_from_row(r) for r in data.pop("rows")]
+    return data
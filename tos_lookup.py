@@ -0,0 +1,151 @@
+# tos_lookup.py
+# Headless entry point: python -m tos_lookup search|export ...
+# Imports only the database layer, never PySide6, so scheduled reports start
+# quickly on machines without a display.
+import argparse
+import csv
+import datetime
+import json
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+
+import backends
+import database
+from classifier import DEFAULT_RULES
+from config import CONFIG_PATH, load_config
+
+
+# Same columns, in the same order, as the GUI's CSV export
+HEADERS = ["ID", "Assignee", "Description", "Status", "Created", "Type"]
+
+
+def iso_date(value: str) -> str:
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def filters(args):
+    return {
+        "ticket_type": args.type,
+        "since": args.since or "",
+        "until": args.until or "",
+    }
+
+def open_database(args, config):
+    try:
+        database.set_ticket_rules(config["ticket_types"])
+    except ValueError as e:
+        print(f"warning: ticket_types in config ignored, using the defaults: {e}", file=sys.stderr)
+        database.set_ticket_rules(DEFAULT_RULES)
+    # --replica: query an up-to-date local copy (indexed, so much faster)
+    # instead of the share itself
+    name = "replica" if args.replica else args.backend
+    backends.use_backend(backends.create(config, name, args.db), wait=True)
+
+def write_csv(batches, out) -> int:
+    writer = csv.writer(out)
+    writer.writerow(HEADERS)
+    written = 0
+    for batch in batches:
+        writer.writerows([t[k] for k in database.TICKET_KEYS] for t in batch)
+        written += len(batch)
+    return written
+
+def write_jsonl(batches, out) -> int:
+    written = 0
+    for batch in batches:
+        out.writelines(json.dumps(t, ensure_ascii=False) + "\n" for t in batch)
+        written += len(batch)
+    return written
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl}
+
+def output_stream(path):
+    if not path or path == "-":
+        return nullcontext(sys.stdout)
+    return open(path, "w", newline="", encoding="utf-8")
+
+def cmd_search(args) -> int:
+    data = backends.active.search(args.search, args.status, args.page, args.page_size,
+                                  **filters(args))
+    with output_stream(args.output) as out:
+        if args.format == "json":
+            data = {k: v for k, v in data.items() if k != "candidates"}
+            json.dump(data, out, ensure_ascii=False, indent=2)
+            out.write("\n")
+        elif args.format == "jsonl":
+            write_jsonl([data["tickets"]], out)
+        else:
+            write_csv([data["tickets"]], out)
+    if args.format != "json":
+        print(f"{len(data['tickets'])} of {data['total']} matching tickets", file=sys.stderr)
+    return 0
+
+def cmd_export(args) -> int:
+    fmt = args.format
+    if fmt is None:
+        fmt = "jsonl" if args.output and args.output.endswith((".jsonl", ".ndjson")) else "csv"
+    batches = backends.active.iter_export(args.search, args.status, args.batch_size,
+                                          **filters(args))
+    try:
+        with output_stream(args.output) as out:
+            written = WRITERS[fmt](batches, out)
+    except BaseException:
+        # Don't leave a half-written export behind
+        if args.output and args.output != "-":
+            Path(args.output).unlink(missing_ok=True)
+        raise
+    print(f"Exported {written} tickets", file=sys.stderr)
+    return 0
+
+def parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-s", "--search", default="", help="text in the description or number")
+    common.add_argument("--status", default="All",
+                        help=f"All, {', '.join(database.STATUS_FILTERS)} or any State text")
+    common.add_argument("--type", default="", help="ticket type, e.g. ONT or Other")
+    common.add_argument("--since", type=iso_date, help="created on or after YYYY-MM-DD")
+    common.add_argument("--until", type=iso_date, help="created on or before YYYY-MM-DD")
+    common.add_argument("-o", "--output", help="file to write (default stdout)")
+    common.add_argument("--db", help="tickets.db to read instead of the configured one")
+    common.add_argument("--backend", choices=backends.BACKENDS,
+                        help="where to run the query (default: config.json)")
+    common.add_argument("--replica", action="store_true",
+                        help="same as --backend replica")
+    common.add_argument("--config", default=str(CONFIG_PATH), help="config.json to use")
+
+    p = argparse.ArgumentParser(prog="python -m tos_lookup",
+                                description="Search and export TOS tickets without the GUI")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    search = sub.add_parser("search", parents=[common], help="print one page of results")
+    search.add_argument("--page", type=int, default=1)
+    search.add_argument("--page-size", type=int, default=50)
+    search.add_argument("--format", choices=["csv", "json", "jsonl"], default="csv",
+                        help="json includes the total and status/type counts")
+    search.set_defaults(run=cmd_search)
+
+    export = sub.add_parser("export", parents=[common], help="stream every matching ticket")
+    export.add_argument("--format", choices=list(WRITERS),
+                        help="default: jsonl for .jsonl/.ndjson outputs, else csv")
+    export.add_argument("--batch-size", type=int, default=1000)
+    export.set_defaults(run=cmd_export)
+    return p
+
+def main(argv=None) -> int:
+    args = parser().parse_args(argv)
+    open_database(args, load_config(Path(args.config)))
+    try:
+        return args.run(args)
+    except BrokenPipeError:
+        # e.g. piped into head; stop quietly
+        sys.stderr.close()
+        return 0
+    finally:
+        backends.active.close()
+        database.pool.close_all()
+
+if __name__ == "__main__":
+    sys.exit(main())